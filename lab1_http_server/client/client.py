@@ -1,45 +1,194 @@
 import socket
 import os
 import sys
+import threading
+import time
 
-if len(sys.argv) != 4:
-    print("Usage: python client.py server_host server_port filename")
+USAGE = "Usage: python client.py server_host server_port filename [--resume | --parallel N]"
+
+if len(sys.argv) not in (4, 5, 6):
+    print(USAGE)
     sys.exit(1)
 
 server_host = sys.argv[1]
 server_port = int(sys.argv[2])
 filename = sys.argv[3]
+options = sys.argv[4:]
 
 SAVE_DIR = "downloads"
 os.makedirs(SAVE_DIR, exist_ok=True)
 
-with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-    s.connect((server_host, server_port))
+CHUNK_SIZE = 65536  # bytes per recv_into while streaming a body
+
 
-    request = f"GET /{filename} HTTP/1.1\r\nHost: {server_host}\r\nConnection: close\r\n\r\n"
+def open_request(extra_headers=""):
+    """Connect, send a GET for filename and return the socket."""
+    s = socket.create_connection((server_host, server_port))
+    request = f"GET /{filename} HTTP/1.1\r\nHost: {server_host}\r\n{extra_headers}Connection: close\r\n\r\n"
     s.sendall(request.encode())
+    return s
+
 
-    response = b""
-    while True:
+def read_head(s):
+    """Read the response head. Returns (status_code, status_line, headers, start of the body)."""
+    data = b""
+    while b"\r\n\r\n" not in data:
         chunk = s.recv(4096)
         if not chunk:
             break
-        response += chunk
+        data += chunk
+    header_data, _, rest = data.partition(b"\r\n\r\n")
+    lines = header_data.decode().split("\r\n")
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+    return int(lines[0].split(" ")[1]), lines[0], headers, rest
 
-header_data, _, body = response.partition(b"\r\n\r\n")
-headers = header_data.decode().split("\r\n")
-status_line = headers[0]
-print("Status:", status_line)
 
-ext = os.path.splitext(filename)[1].lower()
+def copy_body(s, f, first_chunk, length=None):
+    """
+    Write the body to f as it arrives, CHUNK_SIZE bytes at a time through one reused buffer, so memory
+    stays constant however large the file is and an interrupted transfer keeps what it got. Stops after
+    exactly length bytes, or at end of stream when the length is unknown. Returns the bytes written.
+    """
+    first_chunk = first_chunk[:length]
+    f.write(first_chunk)
+    received = len(first_chunk)
+    buffer = bytearray(CHUNK_SIZE)
+    view = memoryview(buffer)
+    while length is None or received < length:
+        size = CHUNK_SIZE if length is None else min(CHUNK_SIZE, length - received)
+        n = s.recv_into(buffer, size)
+        if not n:
+            if length is None:
+                break
+            raise ConnectionError(f"connection closed after {received} of {length} bytes")
+        f.write(view[:n])
+        received += n
+    return received
+
+
+def report_throughput(received, started, head_received):
+    elapsed = time.perf_counter() - started
+    rate = received / (elapsed or 1e-9) / 1e6
+    print(f"Received {received} bytes in {elapsed:.3f} s ({rate:.2f} MB/s), "
+          f"headers after {(head_received - started) * 1000:.1f} ms")
+
+
+def resumable_download(save_path):
+    """
+    Download into save_path + ".part", continuing from its current size with Range/If-Range
+    if a previous attempt was interrupted. The validator of the partial file is kept next to it.
+    """
+    part_path = save_path + ".part"
+    validator_path = part_path + ".etag"
+    offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    validator = open(validator_path).read() if os.path.exists(validator_path) else None
+
+    extra_headers = ""
+    if offset and validator:
+        extra_headers = f"Range: bytes={offset}-\r\nIf-Range: {validator}\r\n"
+        print(f"Resuming {filename} from byte {offset}")
+
+    with open_request(extra_headers) as s:
+        code, status_line, headers, rest = read_head(s)
+        print("Status:", status_line)
+        if code == 416:  # nothing left to fetch, the partial file is complete
+            os.replace(part_path, save_path)
+            os.remove(validator_path)
+            return
+        if code not in (200, 206):
+            sys.exit(1)
+        if code == 200:
+            offset = 0  # no range support or the file changed: start over
+        with open(validator_path, "w") as v:
+            v.write(headers.get("etag") or headers.get("last-modified", ""))
+        with open(part_path, "r+b" if code == 206 else "wb") as f:
+            f.seek(offset)
+            copy_body(s, f, rest, int(headers["content-length"]))
+
+    os.replace(part_path, save_path)
+    os.remove(validator_path)
+
 
-if ext == ".html":
-    print("HTML Content:\n", body.decode())
-elif ext in [".png", ".jpg", ".jpeg", ".pdf"]:
+def fetch_range(part_path, start, end, validator, errors):
+    try:
+        with open_request(f"Range: bytes={start}-{end}\r\nIf-Range: {validator}\r\n") as s:
+            code, status_line, headers, rest = read_head(s)
+            if code != 206:
+                raise ConnectionError(f"expected 206 for bytes {start}-{end}, got {status_line}")
+            with open(part_path, "r+b") as f:
+                f.seek(start)
+                copy_body(s, f, rest, end - start + 1)
+    except (OSError, ValueError) as e:
+        errors.append(e)
+
+
+def parallel_download(save_path, connections):
+    """Split the file into byte ranges and fetch them over several connections at once."""
+    part_path = save_path + ".part"
+    with open_request("Range: bytes=0-0\r\n") as s:
+        code, status_line, headers, _ = read_head(s)
+    print("Status:", status_line)
+    if code != 206:  # server ignores ranges
+        resumable_download(save_path)
+        return
+
+    size = int(headers["content-range"].rsplit("/", 1)[1])
+    validator = headers.get("etag") or headers.get("last-modified", "")
+    with open(part_path, "wb") as f:
+        f.truncate(size)
+
+    step = -(-size // connections)  # ceil division
+    errors = []
+    threads = [
+        threading.Thread(target=fetch_range,
+                         args=(part_path, start, min(start + step, size) - 1, validator, errors))
+        for start in range(0, size, step)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        print(f"Download failed: {errors[0]}")
+        sys.exit(1)
+    os.replace(part_path, save_path)
+    print(f"Fetched {size} bytes over {len(threads)} connections")
+
+
+if options:
     save_path = os.path.join(SAVE_DIR, os.path.basename(filename))
-    with open(save_path, "wb") as f:
-        f.write(body)
+    if options[0] == "--resume" and len(options) == 1:
+        resumable_download(save_path)
+    elif options[0] == "--parallel" and len(options) == 2:
+        parallel_download(save_path, int(options[1]))
+    else:
+        print(USAGE)
+        sys.exit(1)
     print(f"{filename} saved to {save_path}")
-else:
-    print("Unknown file type, printing as text:")
-    print(body.decode(errors='ignore'))
\ No newline at end of file
+    sys.exit(0)
+
+ext = os.path.splitext(filename)[1].lower()
+started = time.perf_counter()
+
+# The head is parsed as soon as it arrives; the body is then streamed straight to its destination.
+with open_request() as s:
+    code, status_line, headers, rest = read_head(s)
+    head_received = time.perf_counter()
+    print("Status:", status_line)
+    length = int(headers["content-length"]) if "content-length" in headers else None
+
+    if ext in [".png", ".jpg", ".jpeg", ".pdf"]:
+        save_path = os.path.join(SAVE_DIR, os.path.basename(filename))
+        with open(save_path, "wb") as f:
+            received = copy_body(s, f, rest, length)
+        print(f"{filename} saved to {save_path}")
+    else:
+        print("HTML Content:\n" if ext == ".html" else "Unknown file type, printing as text:", flush=True)
+        received = copy_body(s, sys.stdout.buffer, rest, length)
+        sys.stdout.buffer.flush()
+        print()
+
+report_throughput(received, started, head_received)
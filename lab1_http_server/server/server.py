@@ -1,5 +1,12 @@
 import socket
 import os
+import time
+import hashlib
+import uuid
+from email.utils import formatdate, parsedate_to_datetime
+
+from http_parser import RequestParser, HttpError
+import access_log
 
 HOST = "0.0.0.0"
 PORT = 8080
@@ -11,84 +18,259 @@ MIME_TYPES = {
     ".pdf": "application/pdf",
 }
 
+MAX_RANGES = 16  # requests asking for more ranges than this get the whole file
+
+listing_cache = {}  # directory path -> (mtime_ns, body, validators)
+
 
 def get_mime_type(filename):
     _, ext = os.path.splitext(filename)
     return MIME_TYPES.get(ext, "application/octet-stream")
 
 
-def build_response(status, body, content_type="text/html"):
+def build_headers(status, content_length, content_type="text/html", headers=None):
     response = f"HTTP/1.1 {status}\r\n"
     response += f"Content-Type: {content_type}\r\n"
-    response += f"Content-Length: {len(body)}\r\n"
+    response += f"Content-Length: {content_length}\r\n"
+    for name, value in (headers or {}).items():
+        response += f"{name}: {value}\r\n"
     response += "Connection: close\r\n\r\n"
-    response = response.encode() + body
-    return response
+    return response.encode()
 
 
-def generate_directory_listing(path, relative_path):
-    items = os.listdir(path)
-    html = f"<html><head><title>Directory listing for /{relative_path}</title></head><body>"
-    html += f"<h2>Directory listing for /{relative_path}</h2><ul>"
+def build_response(status, body, content_type="text/html", headers=None):
+    return build_headers(status, len(body), content_type, headers) + body
+
+
+def build_not_modified(validators):
+    """Bodyless 304 carrying the same validators a 200 would have."""
+    response = "HTTP/1.1 304 Not Modified\r\n"
+    for name, value in validators.items():
+        response += f"{name}: {value}\r\n"
+    response += "Connection: close\r\n\r\n"
+    return response.encode()
+
+
+def file_validators(st):
+    """Strong ETag (from mtime and size) and Last-Modified headers for a file's stat result."""
+    return {
+        "ETag": f'"{st.st_mtime_ns:x}-{st.st_size:x}"',
+        "Last-Modified": formatdate(st.st_mtime, usegmt=True),
+    }
+
+
+def is_not_modified(request_headers, validators, mtime=None):
+    """
+    Evaluate If-None-Match (preferred) or If-Modified-Since against the current validators.
+    mtime is the resource's modification time, or None if it has no Last-Modified.
+    """
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or validators["ETag"] in tags
+    if_modified_since = request_headers.get("if-modified-since")
+    if if_modified_since and mtime is not None:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def parse_range(range_header, size):
+    """
+    Parse a Range header into a list of inclusive (start, end) byte ranges clipped to size.
+    Returns None if the header should be ignored (other unit, malformed, too many ranges)
+    and [] if none of the ranges can be satisfied.
+    """
+    unit, _, spec = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or not spec:
+        return None
+    specs = spec.split(",")
+    if len(specs) > MAX_RANGES:
+        return None
+    ranges = []
+    for part in specs:
+        first, dash, last = part.strip().partition("-")
+        # only ASCII digits: int() would also take signs, spaces and underscores
+        if not dash or not (first or last) or not all(
+                value.isascii() and value.isdigit() for value in (first, last) if value):
+            return None
+        if first == "":  # suffix range: the last N bytes
+            length = int(last)
+            if length == 0:
+                continue
+            start, end = max(size - length, 0), size - 1
+        else:
+            start = int(first)
+            if last and int(last) < start:
+                return None
+            end = min(int(last), size - 1) if last else size - 1
+        if start < size:
+            ranges.append((start, end))
+    return ranges
+
+
+def if_range_matches(request_headers, validators):
+    """A Range is only honoured if If-Range is absent or still matches the file (strong comparison)."""
+    if_range = request_headers.get("if-range")
+    if if_range is None:
+        return True
+    if if_range.startswith('"'):
+        return if_range == validators["ETag"]
+    return if_range == validators["Last-Modified"]
 
+
+def send_file(conn, f, content_type, request_headers):
+    """
+    Send an open file as a 304, 416, 206 (single or multipart/byteranges) or full 200 response.
+    Returns (status code, bytes sent) for the access log.
+    """
+    st = os.fstat(f.fileno())
+    validators = file_validators(st)
+    if is_not_modified(request_headers, validators, st.st_mtime):
+        response = build_not_modified(validators)
+        conn.sendall(response)
+        return 304, len(response)
+
+    ranges = None
+    if "range" in request_headers and if_range_matches(request_headers, validators):
+        ranges = parse_range(request_headers["range"], st.st_size)
+    headers = dict(validators, **{"Accept-Ranges": "bytes"})
+
+    if ranges == []:
+        body = "<h1>416 Range Not Satisfiable</h1>".encode()
+        response = build_response("416 Range Not Satisfiable", body,
+                                  headers={"Content-Range": f"bytes */{st.st_size}"})
+        conn.sendall(response)
+        return 416, len(response)
+    if ranges is None:
+        response = build_headers("200 OK", st.st_size, content_type, headers)
+        conn.sendall(response)
+        conn.sendfile(f)  # stream the body without reading it into memory
+        return 200, len(response) + st.st_size
+    if len(ranges) == 1:
+        start, end = ranges[0]
+        headers["Content-Range"] = f"bytes {start}-{end}/{st.st_size}"
+        response = build_headers("206 Partial Content", end - start + 1, content_type, headers)
+        conn.sendall(response)
+        conn.sendfile(f, start, end - start + 1)
+        return 206, len(response) + end - start + 1
+
+    boundary = uuid.uuid4().hex
+    part_heads = [
+        f"\r\n--{boundary}\r\nContent-Type: {content_type}\r\n"
+        f"Content-Range: bytes {start}-{end}/{st.st_size}\r\n\r\n".encode()
+        for start, end in ranges
+    ]
+    closing = f"\r\n--{boundary}--\r\n".encode()
+    content_length = (sum(len(head) for head in part_heads) + len(closing)
+                      + sum(end - start + 1 for start, end in ranges))
+    response = build_headers("206 Partial Content", content_length,
+                             f"multipart/byteranges; boundary={boundary}", headers)
+    conn.sendall(response)
+    for head, (start, end) in zip(part_heads, ranges):
+        conn.sendall(head)
+        conn.sendfile(f, start, end - start + 1)
+    conn.sendall(closing)
+    return 206, len(response) + content_length
+
+
+def generate_directory_listing(path, relative_path):
+    parts = [
+        f"<html><head><title>Directory listing for /{relative_path}</title></head><body>",
+        f"<h2>Directory listing for /{relative_path}</h2><ul>",
+    ]
     if relative_path:
         parent_path = os.path.dirname(relative_path.rstrip('/'))
-        html += f'<li><a href="/{parent_path}">../</a></li>'
-    for item in items:
-        if item.startswith("."):
-            continue
-        item_path = os.path.join(path, item)
-        display_name = item + '/' if os.path.isdir(item_path) else item
-        if relative_path:
-            url = f"/{relative_path}/{item}".replace("//", "/")
-        else:
-            url = f"/{item}"
+        parts.append(f'<li><a href="/{parent_path}">../</a></li>')
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.name.startswith("."):
+                continue
+            display_name = entry.name + '/' if entry.is_dir() else entry.name
+            if relative_path:
+                url = f"/{relative_path}/{entry.name}".replace("//", "/")
+            else:
+                url = f"/{entry.name}"
+            parts.append(f'<li><a href="{url}">{display_name}</a></li>')
+    parts.append("</ul></body></html>")
+    return "".join(parts)
 
-        html += f'<li><a href="{url}">{display_name}</a></li>'
-    html += "</ul></body></html>"
-    return html
+
+def get_directory_listing(path, relative_path):
+    """Listing body and its ETag, rebuilt only when the directory's mtime changes (an entry was added, removed or renamed)."""
+    mtime_ns = os.stat(path).st_mtime_ns
+    cached = listing_cache.get(path)
+    if cached is None or cached[0] != mtime_ns:
+        body = generate_directory_listing(path, relative_path).encode()
+        cached = mtime_ns, body, {"ETag": f'"{hashlib.sha1(body).hexdigest()[:16]}"'}
+        listing_cache[path] = cached
+    return cached[1], cached[2]
+
+
+def handle_client(conn, addr):
+    with conn:
+        access_log.log("debug", "connected", client=f"{addr[0]}:{addr[1]}")
+        parser = RequestParser()
+        request = None
+        try:
+            while request is None:  # receive the http req, however it is split
+                chunk = conn.recv(4096)
+                if not chunk:
+                    break
+                parser.feed(chunk)
+                request = parser.next_request()
+        except HttpError as e:
+            response = build_response(e.status, f"<h1>{e.status}</h1>".encode())
+            conn.sendall(response)
+            access_log.access(addr[0], "-", "-", int(e.status[:3]), len(response), time.perf_counter())
+            return
+
+        if request is None:
+            return
+        started = time.perf_counter()
+        access_log.log("debug", "request", client=addr[0], head=request.head)
+
+        path = request.path
+        request_headers = request.headers
+        relative_path = path.lstrip("/")  # remove leading slash
+        filepath = os.path.join(BASE_DIR, relative_path)
+
+        if os.path.exists(filepath) and os.path.isfile(filepath):
+            _, ext = os.path.splitext(filepath)
+            if ext in MIME_TYPES:
+                with open(filepath, "rb") as f:
+                    status, sent = send_file(conn, f, MIME_TYPES[ext], request_headers)
+                access_log.access(addr[0], request.method, path, status, sent, started)
+                return
+            body = "<h1>404 Not Found</h1>".encode()
+            response = build_response("404 Not Found", body)
+        elif os.path.isdir(filepath):
+            body, validators = get_directory_listing(filepath, relative_path)
+            if is_not_modified(request_headers, validators):
+                response = build_not_modified(validators)
+            else:
+                response = build_response("200 OK", body, "text/html", validators)
+        else:
+            body = "<h1>404 Not Found</h1>".encode()
+            response = build_response("404 Not Found", body)
+        conn.sendall(response)
+        access_log.access(addr[0], request.method, path, int(response[9:12]), len(response), started)
 
 
 def main():
+    access_log.start_logger()
     with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
         s.bind((HOST, PORT))
         s.listen(1)
-        print(f"Serving on http://localhost:{PORT}")
+        access_log.log("info", "serving", url=f"http://localhost:{PORT}")
         while True:
             conn, addr = s.accept()
-            with conn:
-                print(f"Connected by {addr}")
-                request = conn.recv(1024).decode("utf-8")  # receive the http req
-                print(f"Request:\n{request}")
-
-                if not request:
-                    continue
-
-                path = request.split(" ")[1]
-                relative_path = path.lstrip("/")  # remove leading slash
-                filepath = os.path.join(BASE_DIR, relative_path)
-
-                if os.path.exists(filepath):
-                    if os.path.isfile(filepath):
-                        _, ext = os.path.splitext(filepath)
-                        if ext in MIME_TYPES:
-                            with open(filepath, "rb") as f:
-                                body = f.read()
-                            content_type = MIME_TYPES[ext]
-                            response = build_response("200 OK", body, content_type)
-                            conn.sendall(response)
-                        else:
-                            body = "<h1>404 Not Found</h1>".encode()
-                            response = build_response("404 Not Found", body)
-                            conn.sendall(response)
-                    elif os.path.isdir(filepath):
-                        listing_html = generate_directory_listing(filepath, relative_path)
-                        response = build_response("200 OK", listing_html.encode(), "text/html")
-                        conn.sendall(response)
-                else:
-                    body = "<h1>404 Not Found</h1>".encode()
-                    response = build_response("404 Not Found", body)
-                    conn.sendall(response)
+            try:
+                handle_client(conn, addr)
+            except OSError as e:  # e.g. the client aborted a download mid-sendfile
+                access_log.log("error", "connection failed", client=f"{addr[0]}:{addr[1]}", error=str(e))
 
 
 if __name__ == "__main__":
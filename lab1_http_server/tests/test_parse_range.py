@@ -0,0 +1,64 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "server"))
+
+from server import parse_range, MAX_RANGES
+
+# Behaviour tests for Range header parsing in server/server.py. parse_range returns the byte ranges
+# to serve, [] for 416 Range Not Satisfiable, or None to ignore the header and send the whole file.
+# No server needed:
+#
+#   python tests/test_parse_range.py
+
+SIZE = 1000
+
+
+def test_single_ranges():
+    assert parse_range("bytes=0-99", SIZE) == [(0, 99)]
+    assert parse_range("bytes=500-", SIZE) == [(500, 999)]  # open-ended
+    assert parse_range("bytes=900-5000", SIZE) == [(900, 999)]  # end clipped to the file
+    assert parse_range("bytes=999-999", SIZE) == [(999, 999)]
+
+
+def test_suffix_ranges():
+    assert parse_range("bytes=-100", SIZE) == [(900, 999)]
+    assert parse_range("bytes=-5000", SIZE) == [(0, 999)]  # longer than the file: all of it
+
+
+def test_multiple_ranges():
+    assert parse_range("bytes=0-9, 20-29,-10", SIZE) == [(0, 9), (20, 29), (990, 999)]
+    assert parse_range("BYTES = 0-9", SIZE) == [(0, 9)]
+
+
+def test_unsatisfiable():
+    assert parse_range("bytes=1000-", SIZE) == []
+    assert parse_range("bytes=-0", SIZE) == []
+    assert parse_range("bytes=0-9", 0) == []
+    # unsatisfiable ranges are dropped as long as one can be served
+    assert parse_range("bytes=5000-6000,0-9", SIZE) == [(0, 9)]
+
+
+def test_ignored_headers():
+    for header in ("items=0-9", "bytes=", "bytes=5", "bytes=-", "bytes=9-0", "bytes=a-b", "bytes=0-9,x"):
+        assert parse_range(header, SIZE) is None, header
+
+
+def test_only_ascii_digits():
+    for header in ("bytes=+5-9", "bytes=0--9", "bytes=1_0-20", "bytes=0-1_0", "bytes=--5", "bytes=٣-9"):
+        assert parse_range(header, SIZE) is None, header
+
+
+def test_too_many_ranges():
+    many = ",".join(f"{i}-{i}" for i in range(MAX_RANGES + 1))
+    assert parse_range(f"bytes={many}", SIZE) is None
+    allowed = ",".join(f"{i}-{i}" for i in range(MAX_RANGES))
+    assert len(parse_range(f"bytes={allowed}", SIZE)) == MAX_RANGES
+
+
+if __name__ == "__main__":
+    tests = [(name, test) for name, test in globals().items() if name.startswith("test_")]
+    for name, test in tests:
+        test()
+        print(f"{name}: ok")
+    print(f"\n{len(tests)} tests passed")
@@ -1,6 +1,7 @@
 import socket
 import os
 import sys
+import time
 
 if len(sys.argv) != 4:
     print("Usage: python client.py server_host server_port filename")
@@ -13,33 +14,77 @@ filename = sys.argv[3]
 SAVE_DIR = "downloads"
 os.makedirs(SAVE_DIR, exist_ok=True)
 
-with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-    s.connect((server_host, server_port))
+CHUNK_SIZE = 65536  # bytes per recv_into while streaming a body
 
-    request = f"GET /{filename} HTTP/1.1\r\nHost: {server_host}\r\nConnection: close\r\n\r\n"
-    s.sendall(request.encode())
 
-    response = b""
-    while True:
+def read_head(s):
+    """Read the response head. Returns (status_line, headers, start of the body)."""
+    data = b""
+    while b"\r\n\r\n" not in data:
         chunk = s.recv(4096)
         if not chunk:
             break
-        response += chunk
+        data += chunk
+    header_data, _, rest = data.partition(b"\r\n\r\n")
+    lines = header_data.decode().split("\r\n")
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+    return lines[0], headers, rest
 
-header_data, _, body = response.partition(b"\r\n\r\n")
-headers = header_data.decode().split("\r\n")
-status_line = headers[0]
-print("Status:", status_line)
 
-if "200 OK" in status_line:
+def copy_body(s, f, first_chunk, length=None):
+    """
+    Write the body to f as it arrives, CHUNK_SIZE bytes at a time through one reused buffer, so memory
+    stays constant however large the file is. Stops after exactly length bytes, or at end of stream
+    when the length is unknown. Returns the bytes written.
+    """
+    first_chunk = first_chunk[:length]
+    f.write(first_chunk)
+    received = len(first_chunk)
+    buffer = bytearray(CHUNK_SIZE)
+    view = memoryview(buffer)
+    while length is None or received < length:
+        size = CHUNK_SIZE if length is None else min(CHUNK_SIZE, length - received)
+        n = s.recv_into(buffer, size)
+        if not n:
+            if length is None:
+                break
+            raise ConnectionError(f"connection closed after {received} of {length} bytes")
+        f.write(view[:n])
+        received += n
+    return received
+
+
+started = time.perf_counter()
+
+# The head is parsed as soon as it arrives; the body is then streamed straight to its destination.
+with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+    s.connect((server_host, server_port))
+
+    request = f"GET /{filename} HTTP/1.1\r\nHost: {server_host}\r\nConnection: close\r\n\r\n"
+    s.sendall(request.encode())
+
+    status_line, headers, rest = read_head(s)
+    head_received = time.perf_counter()
+    print("Status:", status_line)
+    if "200 OK" not in status_line:
+        sys.exit(0)
+    length = int(headers["content-length"]) if "content-length" in headers else None
+
     ext = os.path.splitext(filename)[1].lower()
-    if ext == ".html":
-        print("HTML Content:\n", body.decode())
-    elif ext in [".png", ".jpg", ".jpeg", ".pdf"]:
+    if ext in [".png", ".jpg", ".jpeg", ".pdf"]:
         save_path = os.path.join(SAVE_DIR, os.path.basename(filename))
         with open(save_path, "wb") as f:
-            f.write(body)
+            received = copy_body(s, f, rest, length)
         print(f"{filename} saved to {save_path}")
     else:
-        print("Unknown file type, printing as text:")
-        print(body.decode(errors='ignore'))
\ No newline at end of file
+        print("HTML Content:\n" if ext == ".html" else "Unknown file type, printing as text:", flush=True)
+        received = copy_body(s, sys.stdout.buffer, rest, length)
+        sys.stdout.buffer.flush()
+        print()
+
+elapsed = time.perf_counter() - started
+print(f"Received {received} bytes in {elapsed:.3f} s ({received / (elapsed or 1e-9) / 1e6:.2f} MB/s), "
+      f"headers after {(head_received - started) * 1000:.1f} ms")
@@ -0,0 +1,116 @@
+import os
+import queue
+import random
+import sys
+import threading
+import time
+
+# Non-blocking structured logging. Request threads (and the asyncio loop) only put a tuple on a
+# bounded queue; a daemon thread formats the records as logfmt lines and writes them to stdout in
+# batches, so a slow terminal or pipe never holds up a request. When the queue is full, records are
+# dropped and counted instead of blocking.
+#
+#   LOG_LEVEL        debug | info | warning | error (default info); access lines are info,
+#                    raw request heads and connection events are debug
+#   LOG_SAMPLE_RATE  fraction of access lines to keep, 0..1 (default 1)
+
+LEVELS = {"debug": 10, "info": 20, "warning": 30, "error": 40}
+LOG_LEVEL = os.getenv("LOG_LEVEL", "info").lower()
+LOG_THRESHOLD = LEVELS.get(LOG_LEVEL, LEVELS["info"])
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "1"))
+LOG_QUEUE_SIZE = 10000
+LOG_BATCH_SIZE = 256  # records written per stdout write/flush
+
+log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+log_stats = {"written": 0, "dropped": 0, "sampled_out": 0}
+logger_thread = None
+logger_lock = threading.Lock()
+
+
+def enqueue(record):
+    try:
+        log_queue.put_nowait(record)
+    except queue.Full:
+        log_stats["dropped"] += 1  # approximate under contention, never blocks
+
+
+def log(level, message, **fields):
+    """Queue a free-form event, e.g. log("info", "serving", port=8080)."""
+    if LEVELS[level] >= LOG_THRESHOLD:
+        enqueue((time.time(), level, message, fields))
+
+
+def access(client_ip, method, path, status, sent, started):
+    """Queue an access line; started is the time.perf_counter() value when the request was read."""
+    if LEVELS["info"] < LOG_THRESHOLD:
+        return
+    if LOG_SAMPLE_RATE < 1 and random.random() >= LOG_SAMPLE_RATE:
+        log_stats["sampled_out"] += 1
+        return
+    latency_ms = (time.perf_counter() - started) * 1000
+    enqueue((time.time(), "info", "access", {
+        "client": client_ip, "method": method, "path": path, "status": status, "bytes": sent,
+        "ms": f"{latency_ms:.3f}",
+    }))
+
+
+def format_value(value):
+    value = str(value)
+    if not value or any(c in value for c in ' "=\r\n'):
+        escaped = value.replace("\\", "\\\\").replace('"', '\\"').replace("\r", "\\r").replace("\n", "\\n")
+        return '"' + escaped + '"'
+    return value
+
+
+def format_record(record):
+    timestamp, level, message, fields = record
+    ts = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(timestamp)) + f".{int(timestamp % 1 * 1000):03d}Z"
+    line = f"ts={ts} level={level} event={format_value(message)}"
+    for name, value in fields.items():
+        line += f" {name}={format_value(value)}"
+    return line + "\n"
+
+
+def writer_loop(stream):
+    while True:
+        batch = [log_queue.get()]
+        while len(batch) < LOG_BATCH_SIZE:
+            try:
+                batch.append(log_queue.get_nowait())
+            except queue.Empty:
+                break
+        try:
+            stream.write("".join(format_record(record) for record in batch))
+            stream.flush()
+        except (OSError, ValueError):
+            pass  # stdout closed or broken pipe: keep draining so producers never block
+        log_stats["written"] += len(batch)
+
+
+def start_logger(stream=None):
+    """Start the writer thread once per process."""
+    global logger_thread
+    with logger_lock:
+        if logger_thread is None:
+            logger_thread = threading.Thread(target=writer_loop, args=(stream or sys.stdout,),
+                                             name="AccessLog", daemon=True)
+            logger_thread.start()
+
+
+def reset_after_fork():
+    """A forked child (see prefork.py) gets a fresh queue and starts its own writer thread."""
+    global log_queue, logger_thread, logger_lock
+    log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    logger_thread = None
+    logger_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=reset_after_fork)
+
+
+def get_log_stats():
+    stats = dict(log_stats)
+    stats["queued"] = log_queue.qsize()
+    stats["level"] = LOG_LEVEL
+    stats["sample_rate"] = LOG_SAMPLE_RATE
+    return stats
@@ -0,0 +1,112 @@
+import asyncio
+import os
+import time
+
+from server import (
+    HOST, PORT, KEEP_ALIVE_TIMEOUT, MAX_KEEP_ALIVE_REQUESTS, MAX_HEADER_SIZE,
+    TOO_MANY_REQUESTS_RESPONSE, build_error_response, wants_keep_alive, handle_request, is_rate_limited,
+    start_rate_limit_evictor, response_size,
+)
+from http_parser import RequestParser, HttpError
+from latency import delay_for
+import access_log
+
+# asyncio engine: same routing, listing, hit counter and rate limiting as server.py,
+# but every connection is a coroutine on one event loop instead of a worker thread,
+# so idle keep-alive connections cost a few KB instead of a blocked thread.
+LISTEN_BACKLOG = 1024
+
+
+async def send_response(writer, response, body=None):
+    """asyncio counterpart of server.send_response: file slices go out with loop.sendfile."""
+    writer.writelines(response)
+    await writer.drain()
+    if body is not None:
+        file, parts = body
+        with file:
+            for part in parts:
+                if isinstance(part, bytes):
+                    writer.write(part)
+                    await writer.drain()
+                else:
+                    offset, count = part
+                    await asyncio.get_running_loop().sendfile(writer.transport, file, offset, count)
+
+
+async def read_request(reader, parser):
+    """Read until the parser has a complete request. Returns None if the peer closed first."""
+    request = parser.next_request()
+    while request is None:
+        chunk = await asyncio.wait_for(reader.read(65536), KEEP_ALIVE_TIMEOUT)
+        if not chunk:
+            return None
+        parser.feed(chunk)
+        request = parser.next_request()
+    return request
+
+
+async def handle_connection(reader, writer):
+    addr = writer.get_extra_info("peername")
+    client_ip = addr[0]
+    access_log.log("debug", "connected", client=f"{addr[0]}:{addr[1]}")
+    parser = RequestParser(MAX_HEADER_SIZE)
+    served = 0
+    try:
+        while served < MAX_KEEP_ALIVE_REQUESTS:
+            try:
+                request = await read_request(reader, parser)
+            except (asyncio.TimeoutError, ConnectionError):
+                return  # idle keep-alive connection or client went away
+            except HttpError as e:
+                response = build_error_response(e.status)
+                writer.writelines(response)
+                await writer.drain()
+                access_log.access(client_ip, "-", "-", int(e.status[:3]), response_size(response), time.perf_counter())
+                return
+            if request is None:
+                return
+            started = time.perf_counter()
+            access_log.log("debug", "request", client=client_ip, head=request.head)
+            served += 1
+
+            if is_rate_limited(client_ip):
+                writer.writelines(TOO_MANY_REQUESTS_RESPONSE)
+                await writer.drain()
+                access_log.access(client_ip, request.method, request.path, 429,
+                                  response_size(TOO_MANY_REQUESTS_RESPONSE), started)
+                return   # close the connection immediately
+
+            keep_alive = wants_keep_alive(request.version, request.headers) and served < MAX_KEEP_ALIVE_REQUESTS
+            delay = delay_for(request.path)
+            if delay:
+                await asyncio.sleep(delay)  # simulated backend latency, see latency.py
+            response, body = handle_request(request.path, client_ip, keep_alive, request.headers)
+            sent = response_size(response, body)
+            await send_response(writer, response, body)
+            access_log.access(client_ip, request.method, request.path, int(response[0][9:12]), sent, started)
+            if not keep_alive:
+                return
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(listener=None):
+    if listener is None:
+        server = await asyncio.start_server(handle_connection, HOST, PORT, backlog=LISTEN_BACKLOG)
+    else:
+        server = await asyncio.start_server(handle_connection, sock=listener, backlog=LISTEN_BACKLOG)
+    access_log.log("info", "serving", url=f"http://localhost:{PORT}", engine="asyncio", pid=os.getpid())
+    async with server:
+        await server.serve_forever()
+
+
+def main(listener=None):
+    access_log.start_logger()
+    start_rate_limit_evictor()
+    asyncio.run(serve(listener))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+import re
+from collections import namedtuple
+
+# Incremental HTTP/1.x request parser. Bytes are fed in as they arrive from the socket, in
+# chunks of any size, and complete requests are pulled out one at a time, so pipelined
+# requests on one connection come out in order. The buffer never holds more than one
+# request head plus one body, both bounded.
+
+Request = namedtuple("Request", "method path version headers body head")
+
+MAX_HEADER_SIZE = 8192  # bytes of request line + headers
+MAX_BODY_SIZE = 1024 * 1024  # bytes
+MAX_CHUNK_LINE = 1024  # bytes of a chunk-size line incl. extensions
+HEX_DIGITS = b"0123456789abcdefABCDEF"
+CONTROL_CHARS = re.compile(r"[\x00-\x1f\x7f]")  # never valid in a request-target (NUL, CR, tab, DEL, ...)
+
+
+class HttpError(Exception):
+    """A request that can't be parsed; status is the status line to answer with before closing."""
+
+    def __init__(self, status):
+        super().__init__(status)
+        self.status = status
+
+
+class RequestParser:
+    def __init__(self, max_header_size=MAX_HEADER_SIZE, max_body_size=MAX_BODY_SIZE):
+        self.max_header_size = max_header_size
+        self.max_body_size = max_body_size
+        self.buffer = bytearray()
+        self.scanned = 0  # buffer offset already searched for the end of the current line/head
+        self.pending = None  # parsed head waiting for its body
+        self.body = bytearray()
+        self.chunk_remaining = None  # bytes left in the current chunk, None between chunks
+        self.in_trailers = False
+
+    def feed(self, data):
+        self.buffer += data
+
+    def in_request(self):
+        """True once part of a request has arrived that next_request() can't return yet."""
+        return self.pending is not None or bool(self.buffer.strip(b"\r\n"))
+
+    def next_request(self):
+        """Return the next complete Request, or None if more data is needed. Raises HttpError."""
+        if self.pending is None:
+            self.pending = self._parse_head()
+            if self.pending is None:
+                return None
+
+        method, path, version, headers, head = self.pending
+        if "transfer-encoding" in headers:
+            if not self._read_chunked():
+                return None
+        else:
+            length = self._content_length(headers)
+            if len(self.buffer) < length:
+                return None
+            self.body = self.buffer[:length]
+            del self.buffer[:length]
+
+        request = Request(method, path, version, headers, bytes(self.body), head)
+        self.pending = None
+        self.body = bytearray()
+        self.chunk_remaining = None
+        self.in_trailers = False
+        return request
+
+    def _parse_head(self):
+        # tolerate empty lines before the request line (RFC 9112 section 2.2)
+        while self.buffer[:2] == b"\r\n":
+            del self.buffer[:2]
+            self.scanned = 0
+        end = self.buffer.find(b"\r\n\r\n", max(self.scanned - 3, 0))
+        if end == -1:
+            self.scanned = len(self.buffer)
+            if len(self.buffer) > self.max_header_size:
+                raise HttpError("431 Request Header Fields Too Large")
+            return None
+        if end > self.max_header_size:
+            raise HttpError("431 Request Header Fields Too Large")
+        head = self.buffer[:end].decode("iso-8859-1")
+        del self.buffer[:end + 4]
+        self.scanned = 0
+
+        lines = head.split("\r\n")
+        parts = lines[0].split(" ")
+        if (len(parts) != 3 or not parts[0].isalpha() or not parts[2].startswith("HTTP/1.")
+                or CONTROL_CHARS.search(parts[1])):
+            raise HttpError("400 Bad Request")
+        method, path, version = parts
+
+        headers = {}
+        for line in lines[1:]:
+            name, colon, value = line.partition(":")
+            if not colon or not name or name != name.strip():
+                raise HttpError("400 Bad Request")  # also rejects obsolete line folding
+            name = name.lower()
+            value = value.strip()
+            headers[name] = f"{headers[name]}, {value}" if name in headers else value
+
+        if "transfer-encoding" in headers:
+            if "content-length" in headers:
+                raise HttpError("400 Bad Request")  # ambiguous framing, a request smuggling vector
+            if headers["transfer-encoding"].lower() != "chunked":
+                raise HttpError("501 Not Implemented")
+        else:
+            self._content_length(headers)
+        return method, path, version, headers, head
+
+    def _content_length(self, headers):
+        value = headers.get("content-length", "0")
+        if not (value.isascii() and value.isdigit()):
+            raise HttpError("400 Bad Request")
+        length = int(value)
+        if length > self.max_body_size:
+            raise HttpError("413 Content Too Large")
+        return length
+
+    def _read_line(self, limit):
+        end = self.buffer.find(b"\r\n", max(self.scanned - 1, 0))
+        if end == -1:
+            self.scanned = len(self.buffer)
+            if len(self.buffer) > limit:
+                raise HttpError("400 Bad Request")
+            return None
+        line = bytes(self.buffer[:end])
+        del self.buffer[:end + 2]
+        self.scanned = 0
+        return line
+
+    def _read_chunked(self):
+        """Consume as much of a chunked body as is buffered; True once the last chunk and trailers are in."""
+        while True:
+            if self.in_trailers:
+                line = self._read_line(self.max_header_size)
+                if line is None:
+                    return False
+                if line == b"":
+                    return True
+                continue  # trailer fields are accepted and ignored
+            if self.chunk_remaining is None:
+                line = self._read_line(MAX_CHUNK_LINE)
+                if line is None:
+                    return False
+                size = line.split(b";", 1)[0].strip()
+                if not size or size.translate(None, HEX_DIGITS):
+                    raise HttpError("400 Bad Request")
+                self.chunk_remaining = int(size, 16)
+                if self.chunk_remaining == 0:
+                    self.in_trailers = True
+                    self.chunk_remaining = None
+                    continue
+                if len(self.body) + self.chunk_remaining > self.max_body_size:
+                    raise HttpError("413 Content Too Large")
+            # chunk data followed by CRLF
+            if len(self.buffer) < self.chunk_remaining + 2:
+                return False
+            if self.buffer[self.chunk_remaining:self.chunk_remaining + 2] != b"\r\n":
+                raise HttpError("400 Bad Request")
+            self.body += self.buffer[:self.chunk_remaining]
+            del self.buffer[:self.chunk_remaining + 2]
+            self.chunk_remaining = None
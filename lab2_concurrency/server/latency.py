@@ -0,0 +1,53 @@
+import fnmatch
+import os
+import random
+
+# Simulated backend latency, off by default. The LATENCY environment variable holds comma-separated
+# rules "<route pattern>=<distribution>:<params>"; the first pattern (fnmatch syntax, matched against
+# the request path) that fits picks the delay. Distributions, all in seconds:
+#   fixed:S              always S
+#   uniform:LO:HI        uniformly between LO and HI
+#   normal:MU:SIGMA      gaussian, clamped at 0
+#   exponential:MEAN     exponential with the given mean
+#   lognormal:MEDIAN:SIGMA  log-normal, long right tail (SIGMA is the std dev of the underlying normal)
+# Example, the original lab behaviour plus a slow subdirectory:
+#   LATENCY="/subdir/*=uniform:0.5:2,*=fixed:1"
+# Engines sleep for delay_for(path) before handling the request, outside of any lock.
+
+DISTRIBUTIONS = {
+    "fixed": (1, lambda s: s),
+    "uniform": (2, random.uniform),
+    "normal": (2, lambda mu, sigma: max(0.0, random.gauss(mu, sigma))),
+    "exponential": (1, lambda mean: random.expovariate(1 / mean) if mean > 0 else 0.0),
+    "lognormal": (2, lambda median, sigma: random.lognormvariate(0, sigma) * median),
+}
+
+
+def parse_latency_spec(spec):
+    """Parse a LATENCY string into a list of (pattern, sample) rules. Raises ValueError on a bad rule."""
+    rules = []
+    for rule in filter(None, (r.strip() for r in spec.split(","))):
+        pattern, eq, distribution = rule.rpartition("=")
+        name, *params = distribution.split(":")
+        if not eq or not pattern or name not in DISTRIBUTIONS:
+            raise ValueError(f"bad latency rule {rule!r}")
+        arity, sample = DISTRIBUTIONS[name]
+        try:
+            params = [float(p) for p in params]
+        except ValueError:
+            raise ValueError(f"bad latency rule {rule!r}") from None
+        if len(params) != arity or min(params) < 0:
+            raise ValueError(f"bad latency rule {rule!r}")
+        rules.append((pattern, lambda sample=sample, params=params: sample(*params)))
+    return rules
+
+
+latency_rules = parse_latency_spec(os.getenv("LATENCY", ""))
+
+
+def delay_for(path):
+    """Seconds to delay a request for path, 0.0 when no rule matches (or injection is off)."""
+    for pattern, sample in latency_rules:
+        if fnmatch.fnmatchcase(path, pattern):
+            return sample()
+    return 0.0
@@ -0,0 +1,73 @@
+import multiprocessing
+import signal
+import socket
+import threading
+from multiprocessing.connection import wait
+
+import server
+import access_log
+from shared_table import SharedTable
+
+# Prefork mode: a supervisor process starts WORKER_PROCESSES copies of the configured engine, each
+# in its own process with its own GIL. With SO_REUSEPORT every worker binds its own listening
+# socket and the kernel spreads incoming connections across them; without it the workers share
+# one socket bound by the supervisor. Dead workers are restarted.
+#
+# Hit counts and rate-limit buckets live in shared-memory hash tables created before the workers
+# fork, so every worker sees the same counts and one global limit per client IP. The supervisor
+# sweeps idle buckets out of the shared rate-limit table.
+
+RESTART_DELAY = 1  # seconds before restarting a worker that exited
+
+stopping = threading.Event()
+
+
+def run_worker(index, listener):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # the supervisor handles Ctrl+C and stops the workers
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)  # undo the supervisor's handler inherited through fork
+    server.run_engine(listener or server.create_listener(reuse_port=True))
+
+
+def start_worker(index, listener):
+    process = multiprocessing.get_context("fork").Process(
+        target=run_worker, args=(index, listener), name=f"Worker-{index}", daemon=True
+    )
+    process.start()
+    return process
+
+
+def stop(signum, frame):
+    stopping.set()
+
+
+def main():
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    access_log.start_logger()
+
+    server.shared_hits = SharedTable(server.SHARED_TABLE_SLOTS, "Q", key_size=120)
+    server.shared_buckets = SharedTable(server.SHARED_TABLE_SLOTS, "dd", key_size=48)
+    # the shared socket is only needed where the kernel can't balance connections between sockets
+    listener = None if hasattr(socket, "SO_REUSEPORT") else server.create_listener()
+    workers = {i: start_worker(i, listener) for i in range(server.WORKER_PROCESSES)}
+    threading.Thread(target=server.evict_idle_buckets, name="RateLimitEvictor", daemon=True).start()
+    access_log.log("info", "prefork", url=f"http://localhost:{server.PORT}", engine=server.ENGINE,
+                   processes=server.WORKER_PROCESSES, reuse_port=listener is None)
+
+    try:
+        while not stopping.is_set():
+            sentinels = {process.sentinel: i for i, process in workers.items()}
+            for ready in wait(list(sentinels), timeout=1):
+                i = sentinels[ready]
+                process = workers[i]
+                process.join()
+                access_log.log("error", "worker exited", worker=i, pid=process.pid, exitcode=process.exitcode)
+                if not stopping.wait(RESTART_DELAY):
+                    workers[i] = start_worker(i, listener)
+    finally:
+        for process in workers.values():
+            process.terminate()
+        for process in workers.values():
+            process.join()
+        server.shared_hits.destroy()
+        server.shared_buckets.destroy()
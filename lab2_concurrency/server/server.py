@@ -2,9 +2,28 @@ import socket
 import os
 import threading
 import time
+import json
+import queue
+import stat
+import hashlib
+import uuid
+import gzip
+from collections import deque, OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+
+from http_parser import RequestParser, HttpError
+from latency import delay_for
+import access_log
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
 
 HOST = "0.0.0.0"
-PORT = 8080
+PORT = int(os.getenv("PORT", "8080"))
+ENGINE = os.getenv("ENGINE", "threaded")  # "threaded", "asyncio" or "reactor"
+WORKER_PROCESSES = int(os.getenv("WORKER_PROCESSES", "1"))  # >1 runs the engine in that many processes, see prefork.py
 BASE_DIR = os.path.join(os.path.dirname(__file__), "content")
 
 MIME_TYPES = {
@@ -13,16 +32,63 @@ MIME_TYPES = {
     ".pdf": "application/pdf",
 }
 
-hit_counter = {}
-USE_LOCK = True
-counter_lock = threading.Lock()
+# hit counts are sharded per thread: each thread only ever writes its own dict of
+# (client_ip, path) -> hits, so counting takes no lock; readers sum across shards
+counter_shards = []
+counter_shards_lock = threading.Lock()  # only guards registering a new shard
+counter_local = threading.local()
+counter_stats = {"dropped": 0}
 
-rate_limits = {}
-rate_locks = {}
-global_lock = threading.Lock()
+RATE_LIMIT = int(os.getenv("RATE_LIMIT", "10"))  # req per s, token refill rate
+RATE_BURST = int(os.getenv("RATE_BURST", str(RATE_LIMIT)))  # bucket size, requests allowed back to back
+RATE_LOCK_STRIPES = 64
+RATE_EVICT_INTERVAL = 30  # seconds between sweeps for idle clients
 
-RATE_LIMIT = 10  # req per s
-RATE_WINDOW = 1  # seconds
+# token buckets striped by client IP: each stripe maps ip -> [tokens, last_refill] under its own lock
+rate_buckets = [{} for _ in range(RATE_LOCK_STRIPES)]
+rate_locks = [threading.Lock() for _ in range(RATE_LOCK_STRIPES)]
+rate_stats = {"evicted": 0, "table_full": 0}
+
+# with WORKER_PROCESSES > 1, prefork.py replaces both with SharedTables (shared_table.py) created
+# before forking, so all workers count hits and enforce RATE_LIMIT together
+SHARED_TABLE_SLOTS = int(os.getenv("SHARED_TABLE_SLOTS", "65536"))  # entries per table
+shared_hits = None  # "client_ip path" -> (hits,)
+shared_buckets = None  # client_ip -> (tokens, last_refill)
+
+KEEP_ALIVE_TIMEOUT = float(os.getenv("KEEP_ALIVE_TIMEOUT", "5"))  # idle seconds before closing
+# seconds a worker waits for one whole request, however slowly it trickles in (the idle wait included)
+REQUEST_TIMEOUT = float(os.getenv("REQUEST_TIMEOUT", str(KEEP_ALIVE_TIMEOUT)))
+MAX_KEEP_ALIVE_REQUESTS = int(os.getenv("MAX_KEEP_ALIVE_REQUESTS", "100"))  # requests per connection
+MAX_HEADER_SIZE = 8192  # bytes
+
+WORKER_THREADS = int(os.getenv("WORKER_THREADS", "32"))  # fixed size of the worker pool
+ACCEPT_QUEUE_SIZE = int(os.getenv("ACCEPT_QUEUE_SIZE", "128"))  # connections waiting for a worker
+RETRY_AFTER = 1  # seconds, sent with 503 when the accept queue is full
+STATS_PATH = "/_stats"
+
+MAX_RANGES = 16  # requests asking for more ranges than this get the whole file
+
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(32 * 1024 * 1024)))  # total body bytes kept in RAM
+CACHE_MAX_FILE_SIZE = int(os.getenv("CACHE_MAX_FILE_SIZE", str(4 * 1024 * 1024)))  # bigger files use sendfile
+
+connection_queue = queue.Queue(maxsize=ACCEPT_QUEUE_SIZE)
+pool_stats = {"accepted": 0, "rejected": 0, "max_queue_depth": 0, "wait_total": 0.0, "wait_max": 0.0}
+recent_waits = deque(maxlen=1000)  # queue wait times of the last connections, for percentiles
+stats_lock = threading.Lock()
+
+file_cache = OrderedDict()  # filepath -> (mtime_ns, size, header_prefix, body), least recently used first
+cache_stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0, "bytes": 0}
+cache_lock = threading.Lock()
+
+COMPRESSIBLE_TYPES = {"text/html"}
+ENCODINGS = ("br", "gzip") if brotli else ("gzip",)  # in order of preference
+MIN_COMPRESS_SIZE = 256  # bytes, smaller bodies are sent as-is
+COMPRESSED_CACHE_MAX_BYTES = int(os.getenv("COMPRESSED_CACHE_MAX_BYTES", str(8 * 1024 * 1024)))
+
+listing_cache = {}  # directory path -> (mtime_ns, (head, rows, tail))
+
+compressed_cache = OrderedDict()  # (filepath, mtime_ns, size, encoding) -> (header_prefix, body)
+compression_stats = {"hits": 0, "misses": 0, "precompressed": 0, "bytes": 0}
 
 
 def get_mime_type(filename):
@@ -30,40 +96,211 @@ def get_mime_type(filename):
     return MIME_TYPES.get(ext, "application/octet-stream")
 
 
-def build_response(status, body, content_type="text/html"):
-    response = f"HTTP/1.1 {status}\r\n"
-    response += f"Content-Type: {content_type}\r\n"
-    response += f"Content-Length: {len(body)}\r\n"
-    response += "Connection: close\r\n\r\n"
-    response = response.encode() + body
-    return response
+# Responses are tuples of bytes buffers (status line + headers, Connection headers, body) that are
+# written with one scatter/gather sendmsg call, so a body is never copied into a combined buffer.
+# Everything that doesn't depend on the request is built once, here or on first use.
+KEEP_ALIVE_HEADERS = (
+    f"Connection: keep-alive\r\n"
+    f"Keep-Alive: timeout={int(KEEP_ALIVE_TIMEOUT)}, max={MAX_KEEP_ALIVE_REQUESTS}\r\n\r\n"
+).encode()
+CLOSE_HEADERS = b"Connection: close\r\n\r\n"
+CONNECTION_HEADERS = {True: KEEP_ALIVE_HEADERS, False: CLOSE_HEADERS}
+
+GATHER_MIN_BYTES = 8192  # responses with a smaller last buffer (body) are joined and sent with sendall
+
+
+def build_header_prefix(status, content_length, content_type="text/html", headers=None):
+    """
+    Status line and entity headers, everything but the per-connection Connection headers. Formatted
+    in one string and encoded once: measured faster than caching the status line and joining bytes.
+    """
+    head = f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\nContent-Length: {content_length}\r\n"
+    if headers:
+        for name, value in headers.items():
+            head += f"{name}: {value}\r\n"
+    return head.encode()
+
+
+def build_headers(status, content_length, content_type="text/html", keep_alive=False, headers=None):
+    return build_header_prefix(status, content_length, content_type, headers), CONNECTION_HEADERS[keep_alive]
 
 
-def generate_directory_listing(path, relative_path, client_ip):
-    items = os.listdir(path)
-    html = f"<html><head><title>Directory listing for /{relative_path}</title></head><body>"
-    html += f"<h2>Directory listing for /{relative_path}</h2>"
-    html += "<table border='1'><tr><th>File / Directory</th><th>Hits</th></tr>"
+def build_response(status, body, content_type="text/html", keep_alive=False, headers=None):
+    if len(body) < GATHER_MIN_BYTES:
+        # send_buffers would join a small response anyway: join it once here, and not again on every send
+        return b"".join((build_header_prefix(status, len(body), content_type, headers),
+                         CONNECTION_HEADERS[keep_alive], body)),
+    return build_headers(status, len(body), content_type, keep_alive, headers) + (body,)
 
+
+def build_not_modified(validators, keep_alive=False):
+    """Bodyless 304 carrying the same validators a 200 would have."""
+    fields = "".join([f"{name}: {value}\r\n" for name, value in validators.items()])
+    return f"HTTP/1.1 304 Not Modified\r\n{fields}".encode(), CONNECTION_HEADERS[keep_alive]
+
+
+NOT_FOUND_RESPONSES = {
+    keep_alive: build_response("404 Not Found", b"<h1>404 Not Found</h1>", keep_alive=keep_alive)
+    for keep_alive in (True, False)
+}
+TOO_MANY_REQUESTS_RESPONSE = build_response(
+    "429 Too Many Requests",
+    b"<h1>429 Too Many Requests</h1><p>Rate limit exceeded. Please try again later.</p>"
+)
+SERVICE_UNAVAILABLE_RESPONSE = build_response(
+    "503 Service Unavailable",
+    b"<h1>503 Service Unavailable</h1><p>Server is overloaded. Please try again later.</p>",
+    headers={"Retry-After": RETRY_AFTER}
+)
+error_responses = {}  # parser error status -> response
+
+
+def file_validators(st):
+    """Strong ETag (from mtime and size) and Last-Modified headers for a file's stat result."""
+    return {
+        "ETag": f'"{st.st_mtime_ns:x}-{st.st_size:x}"',
+        "Last-Modified": formatdate(st.st_mtime, usegmt=True),
+    }
+
+
+def is_not_modified(request_headers, validators, mtime=None):
+    """
+    Evaluate If-None-Match (preferred) or If-Modified-Since against the current validators.
+    mtime is the resource's modification time, or None if it has no Last-Modified.
+    """
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or validators["ETag"] in tags
+    if_modified_since = request_headers.get("if-modified-since")
+    if if_modified_since and mtime is not None:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def send_buffers(conn, buffers):
+    """sendall for a sequence of buffers: one sendmsg per attempt, resuming after partial writes."""
+    # Only the last buffer (the body) can be large, the heads before it are a few hundred bytes; checking it
+    # alone keeps small responses from paying for summing every length
+    if len(buffers[-1]) < GATHER_MIN_BYTES:
+        conn.sendall(b"".join(buffers))  # copying a few KB is cheaper than setting up the iovecs
+        return
+    total = sum(map(len, buffers))
+    sent = conn.sendmsg(buffers)
+    if sent == total:
+        return  # the common case, everything fit in the socket buffer
+    buffers = list(buffers)
+    while True:
+        while buffers and sent >= len(buffers[0]):
+            sent -= len(buffers[0])
+            del buffers[0]
+        if not buffers:
+            return
+        if sent:
+            buffers[0] = memoryview(buffers[0])[sent:]
+        sent = conn.sendmsg(buffers)
+
+
+def send_response(conn, response, body=None):
+    """
+    Send the response buffers, then the file body if there is one.
+    body is (file, parts): each part is either bytes, sent as-is, or an (offset, count) slice
+    of the file, streamed with sendfile. The file is closed afterwards.
+    """
+    send_buffers(conn, response)
+    if body is not None:
+        file, parts = body
+        with file:
+            for part in parts:
+                if isinstance(part, bytes):
+                    conn.sendall(part)
+                else:
+                    conn.sendfile(file, *part)
+
+
+def response_size(response, body=None):
+    """Bytes a (response, body) pair puts on the wire, for the access log."""
+    size = sum(map(len, response))
+    if body is not None:
+        size += sum(len(part) if isinstance(part, bytes) else part[1] for part in body[1])
+    return size
+
+
+def read_request(conn, parser):
+    """
+    Receive until the parser has a complete request. Returns None if the peer closed first. The
+    socket timeout shrinks towards a REQUEST_TIMEOUT deadline, so a client sending a header line
+    every few seconds can't hold the worker forever: socket.timeout is raised once it passes.
+    """
+    request = parser.next_request()
+    if request is not None:
+        return request  # pipelined, already buffered
+    deadline = time.monotonic() + REQUEST_TIMEOUT
+    try:
+        while request is None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise socket.timeout("request not complete before the deadline")
+            conn.settimeout(remaining)
+            chunk = conn.recv(65536)
+            if not chunk:
+                return None
+            parser.feed(chunk)
+            request = parser.next_request()
+    finally:
+        conn.settimeout(KEEP_ALIVE_TIMEOUT)  # for sending the response
+    return request
+
+
+def build_error_response(status):
+    response = error_responses.get(status)
+    if response is None:
+        response = error_responses[status] = build_response(status, f"<h1>{status}</h1>".encode())
+    return response
+
+
+def wants_keep_alive(version, headers):
+    """HTTP/1.1 connections are persistent unless the client asks to close, HTTP/1.0 only on request."""
+    tokens = {t.strip().lower() for t in headers.get("connection", "").split(",")}
+    if version == "HTTP/1.1":
+        return "close" not in tokens
+    return "keep-alive" in tokens
+
+
+def get_listing_template(path, relative_path, mtime_ns):
+    """
+    Static parts of a directory listing, cached per directory until its mtime changes
+    (adding, removing or renaming an entry updates it). Returns (head, rows, tail) where
+    rows are (row_prefix, url) pairs still missing their hit count cell.
+    """
+    cached = listing_cache.get(path)
+    if cached is not None and cached[0] == mtime_ns:
+        return cached[1]
+
+    head = [
+        f"<html><head><title>Directory listing for /{relative_path}</title></head><body>",
+        f"<h2>Directory listing for /{relative_path}</h2>",
+        "<table border='1'><tr><th>File / Directory</th><th>Hits</th></tr>",
+    ]
     if relative_path:
         parent_path = os.path.dirname(relative_path.rstrip('/'))
-        html += f'<tr><td><a href="/{parent_path}">../</a></td><td></td></tr>'
-
-    for item in items:
-        if item.startswith("."):
-            continue
-        item_path = os.path.join(path, item)
-        display_name = item + '/' if os.path.isdir(item_path) else item
-        if relative_path:
-            url = f"/{relative_path}/{item}".replace("//", "/")
-        else:
-            url = f"/{item}"
+        head.append(f'<tr><td><a href="/{parent_path}">../</a></td><td></td></tr>')
 
-        # Get hit count for this file
-        hits = hit_counter.get(client_ip, {}).get(url, 0)
-        html += f'<tr><td><a href="{url}">{display_name}</a></td><td>{hits}</td></tr>'
+    rows = []
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.name.startswith("."):
+                continue
+            display_name = entry.name + '/' if entry.is_dir() else entry.name
+            if relative_path:
+                url = f"/{relative_path}/{entry.name}".replace("//", "/")
+            else:
+                url = f"/{entry.name}"
+            rows.append((f'<tr><td><a href="{url}">{display_name}</a></td><td>', url))
 
-    html += "</table>"
     # html += """
     #     <script>
     #     function updateCounter() {
@@ -76,141 +313,573 @@ def generate_directory_listing(path, relative_path, client_ip):
     #     setInterval(updateCounter, 1000);  // every 1 second
     #     </script>
     #     """
+    template = "".join(head), rows, "</table></body></html>"
+    listing_cache[path] = (mtime_ns, template)  # a racing rebuild just stores an equal template
+    return template
 
-    html += "</body></html>"
-    return html
 
+def generate_directory_listing(path, relative_path, client_ip, mtime_ns):
+    head, rows, tail = get_listing_template(path, relative_path, mtime_ns)
+    parts = [head]
+    for row_prefix, url in rows:
+        parts += [row_prefix, str(get_hits(client_ip, url)), "</td></tr>"]
+    parts.append(tail)
+    return "".join(parts)
 
-def update_counter(client_ip, path):
-    if client_ip not in hit_counter:
-        hit_counter[client_ip] = {}
-    if path not in hit_counter[client_ip]:
-        hit_counter[client_ip][path] = 0
-    hit_counter[client_ip][path] += 1
 
+def get_counter_shard():
+    shard = getattr(counter_local, "shard", None)
+    if shard is None:
+        shard = counter_local.shard = {}
+        with counter_shards_lock:
+            counter_shards.append(shard)
+    return shard
 
-def handle_client(conn, addr):
-    client_ip = addr[0]
-    if is_rate_limited(client_ip):
-        response = build_response(
-            "429 Too Many Requests",
-            b"<h1>429 Too Many Requests</h1><p>Rate limit exceeded. Please try again later.</p>"
-        )
-        conn.sendall(response)
-        conn.close()   # close the connection immediately
-        return
-
-    with conn:
-        print(f"Connected by {addr}")
-        request = conn.recv(1024).decode("utf-8")  # receive the http req
-        print(f"Request:\n{request}")
 
-        if not request:
-            return
-
-        time.sleep(1)
+def count_hit(values):
+    hits = values[0] + 1 if values else 1
+    return (hits,), hits
 
-        path = request.split(" ")[1]
-        relative_path = path.lstrip("/")  # remove leading slash
-        filepath = os.path.join(BASE_DIR, relative_path)
 
-        update_counter(client_ip, path)
+def update_counter(client_ip, path):
+    if shared_hits is not None:
+        if shared_hits.update(f"{client_ip} {path}".encode(), count_hit) is None:
+            counter_stats["dropped"] += 1  # hit not recorded, the table segment is full
+        return
+    shard = get_counter_shard()
+    key = (client_ip, path)
+    shard[key] = shard.get(key, 0) + 1
 
-        if os.path.exists(filepath):
-            if os.path.isfile(filepath):
-                if USE_LOCK:
-                    with counter_lock:
-                        hit_counter[path] = hit_counter.get(path, 0) + 1
-                        print(f"Thread {threading.current_thread().name}: Reading count for {path}")
-                        current_count = hit_counter[path]
-                        print(f"Thread {threading.current_thread().name}: Current count is {current_count}")
-                        time.sleep(0.1)  # delay to force interleaving
-                        print(f"Thread {threading.current_thread().name}: Updated count to {current_count + 1}")
-                else:
-                    hit_counter[path] = hit_counter.get(path, 0) + 1
-                    print(f"Thread {threading.current_thread().name}: Reading count for {path}")
-                    current_count = hit_counter[path]
-                    print(f"Thread {threading.current_thread().name}: Current count is {current_count}")
-                    time.sleep(0.1)
-                    print(f"Thread {threading.current_thread().name}: Updated count to {current_count + 1}")
-
-                _, ext = os.path.splitext(filepath)
-                if ext in MIME_TYPES:
-                    with open(filepath, "rb") as f:
-                        body = f.read()
-                    content_type = MIME_TYPES[ext]
-                    response = build_response("200 OK", body, content_type)
-                    conn.sendall(response)
-                else:
-                    body = "<h1>404 Not Found</h1>".encode()
-                    response = build_response("404 Not Found", body)
-                    conn.sendall(response)
-            elif os.path.isdir(filepath):
-                if USE_LOCK:
-                    with counter_lock:
-                        hit_counter[path] = hit_counter.get(path, 0) + 1
-                        print(f"Thread {threading.current_thread().name}: Reading count for {path}")
-                        current_count = hit_counter[path]
-                        print(f"Thread {threading.current_thread().name}: Current count is {current_count}")
-                        time.sleep(0.01)
-                        print(f"Thread {threading.current_thread().name}: Updated count to {current_count + 1}")
-                else:
-                    hit_counter[path] = hit_counter.get(path, 0) + 1
-                    print(f"Thread {threading.current_thread().name}: Reading count for {path}")
-                    current_count = hit_counter[path]
-                    print(f"Thread {threading.current_thread().name}: Current count is {current_count}")
-                    time.sleep(0.01)
-                    print(f"Thread {threading.current_thread().name}: Updated count to {current_count + 1}")
-
-                listing_html = generate_directory_listing(filepath, relative_path, client_ip)
-                response = build_response("200 OK", listing_html.encode(), "text/html")
-                conn.sendall(response)
-        else:
-            body = "<h1>404 Not Found</h1>".encode()
-            response = build_response("404 Not Found", body)
-            conn.sendall(response)
 
+def get_hits(client_ip, path):
+    if shared_hits is not None:
+        values = shared_hits.get(f"{client_ip} {path}".encode())
+        return values[0] if values else 0
+    return sum(shard.get((client_ip, path), 0) for shard in counter_shards)
 
-def is_rate_limited(client_ip):
-    current_time = time.time()
-    with global_lock:
-        if client_ip not in rate_limits:
-            rate_limits[client_ip] = []
-        if client_ip not in rate_locks:
-            rate_locks[client_ip] = threading.Lock()
-    with rate_locks[client_ip]:  # use per-IP lock
-        # remove timestamps older than RATE_WINDOW
-        rate_limits[client_ip] = [
-            ts for ts in rate_limits[client_ip]
-            if current_time - ts < RATE_WINDOW
-        ]
-        if len(rate_limits[client_ip]) >= RATE_LIMIT:
-            return True  # too many requests from this IP
-        rate_limits[client_ip].append(current_time)  # else, record this request
 
-        print(f"[{client_ip}] timestamps: {rate_limits[client_ip]}")
+def get_counter_stats():
+    totals = {}
+    if shared_hits is not None:
+        for key, (hits,) in shared_hits.items():
+            path = key.decode(errors="replace").partition(" ")[2]
+            totals[path] = totals.get(path, 0) + hits
+        return {"shared_slots": shared_hits.slots, "dropped": counter_stats["dropped"],
+                "total": sum(totals.values()), "paths": totals}
+    for shard in list(counter_shards):
+        for (_, path), hits in shard.copy().items():
+            totals[path] = totals.get(path, 0) + hits
+    return {"shards": len(counter_shards), "total": sum(totals.values()), "paths": totals}
 
-        return False
 
+def handle_client(conn, addr):
+    client_ip = addr[0]
+    with conn:
+        access_log.log("debug", "connected", client=f"{addr[0]}:{addr[1]}")
+        conn.settimeout(KEEP_ALIVE_TIMEOUT)
+        parser = RequestParser(MAX_HEADER_SIZE)
+        served = 0
+        while served < MAX_KEEP_ALIVE_REQUESTS:
+            try:
+                request = read_request(conn, parser)
+            except socket.timeout:
+                if parser.in_request():  # a slow or stalled request rather than an idle connection
+                    response = build_error_response("408 Request Timeout")
+                    send_buffers(conn, response)
+                    access_log.access(client_ip, "-", "-", 408, response_size(response), time.perf_counter())
+                return
+            except ConnectionError:
+                return  # client went away
+            except HttpError as e:
+                response = build_error_response(e.status)
+                send_buffers(conn, response)
+                access_log.access(client_ip, "-", "-", int(e.status[:3]), response_size(response), time.perf_counter())
+                return
+            if request is None:
+                return
+            started = time.perf_counter()
+            access_log.log("debug", "request", client=client_ip, head=request.head)
+            served += 1
 
-def main():
-    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-        s.bind((HOST, PORT))
-        s.listen(5)
-        print(f"Serving on http://localhost:{PORT}")
+            if is_rate_limited(client_ip):
+                send_buffers(conn, TOO_MANY_REQUESTS_RESPONSE)
+                access_log.access(client_ip, request.method, request.path, 429,
+                                  response_size(TOO_MANY_REQUESTS_RESPONSE), started)
+                return   # close the connection immediately
+
+            # don't let an idle keep-alive connection hold a worker while others are queued
+            keep_alive = (wants_keep_alive(request.version, request.headers) and served < MAX_KEEP_ALIVE_REQUESTS
+                          and connection_queue.empty())
+            delay = delay_for(request.path)
+            if delay:
+                time.sleep(delay)  # simulated backend latency, see latency.py
+            response, body = handle_request(request.path, client_ip, keep_alive, request.headers)
+            sent = response_size(response, body)
+            send_response(conn, response, body)
+            access_log.access(client_ip, request.method, request.path, int(response[0][9:12]), sent, started)
+            if not keep_alive:
+                return
+
+
+def parse_range(range_header, size):
+    """
+    Parse a Range header into a list of inclusive (start, end) byte ranges clipped to size.
+    Returns None if the header should be ignored (other unit, malformed, too many ranges)
+    and [] if none of the ranges can be satisfied.
+    """
+    unit, _, spec = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or not spec:
+        return None
+    specs = spec.split(",")
+    if len(specs) > MAX_RANGES:
+        return None
+    ranges = []
+    for part in specs:
+        first, dash, last = part.strip().partition("-")
+        # only ASCII digits: int() would also take signs, spaces and underscores
+        if not dash or not (first or last) or not all(
+                value.isascii() and value.isdigit() for value in (first, last) if value):
+            return None
+        if first == "":  # suffix range: the last N bytes
+            length = int(last)
+            if length == 0:
+                continue
+            start, end = max(size - length, 0), size - 1
+        else:
+            start = int(first)
+            if last and int(last) < start:
+                return None
+            end = min(int(last), size - 1) if last else size - 1
+        if start < size:
+            ranges.append((start, end))
+    return ranges
+
+
+def if_range_matches(request_headers, validators):
+    """A Range is only honoured if If-Range is absent or still matches the file (strong comparison)."""
+    if_range = request_headers.get("if-range")
+    if if_range is None:
+        return True
+    if if_range.startswith('"'):
+        return if_range == validators["ETag"]
+    return if_range == validators["Last-Modified"]
+
+
+def build_range_response(f, size, ranges, content_type, headers, keep_alive=False):
+    """206 response for an open file: one range directly, several as multipart/byteranges."""
+    headers = dict(headers)
+    if len(ranges) == 1:
+        start, end = ranges[0]
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        response = build_headers("206 Partial Content", end - start + 1, content_type, keep_alive, headers)
+        return response, (f, [(start, end - start + 1)])
+
+    boundary = uuid.uuid4().hex
+    parts = []
+    content_length = 0
+    for start, end in ranges:
+        part_head = (f"\r\n--{boundary}\r\nContent-Type: {content_type}\r\n"
+                     f"Content-Range: bytes {start}-{end}/{size}\r\n\r\n").encode()
+        parts += [part_head, (start, end - start + 1)]
+        content_length += len(part_head) + end - start + 1
+    closing = f"\r\n--{boundary}--\r\n".encode()
+    parts.append(closing)
+    content_length += len(closing)
+    response = build_headers("206 Partial Content", content_length,
+                             f"multipart/byteranges; boundary={boundary}", keep_alive, headers)
+    return response, (f, parts)
+
+
+def choose_encoding(request_headers):
+    """Pick the preferred content coding the client accepts (q > 0), or None for identity."""
+    accepted = {}
+    for item in request_headers.get("accept-encoding", "").split(","):
+        name, _, params = item.partition(";")
+        q = 1.0
+        key, _, value = params.strip().partition("=")
+        if key == "q":
+            try:
+                q = float(value)
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    for encoding in ENCODINGS:
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+def compress(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body)
+    return gzip.compress(body, mtime=0)
+
+
+def encoded_validators(validators, encoding):
+    """Validators of an encoded variant: each representation needs its own strong ETag."""
+    validators = dict(validators)
+    validators["ETag"] = validators["ETag"][:-1] + f'-{encoding}"'
+    return validators
+
+
+def is_cacheable(st):
+    return st.st_size <= min(CACHE_MAX_FILE_SIZE, CACHE_MAX_BYTES)
+
+
+def get_compressed_file(filepath, st, encoding):
+    """
+    Return (header_prefix, body) of a file's encoded variant. A fresh precompressed .gz sibling
+    is used for gzip when present; otherwise the cached body is compressed once. Variants are
+    kept in their own LRU keyed by file and mtime, so stale ones simply age out.
+    """
+    key = (filepath, st.st_mtime_ns, st.st_size, encoding)
+    with cache_lock:
+        variant = compressed_cache.get(key)
+        if variant is not None:
+            compressed_cache.move_to_end(key)
+            compression_stats["hits"] += 1
+            return variant
+        compression_stats["misses"] += 1
+
+    body = None
+    if encoding == "gzip":
+        try:
+            if os.stat(filepath + ".gz").st_mtime >= st.st_mtime:
+                with open(filepath + ".gz", "rb") as f:
+                    body = f.read()
+                with cache_lock:
+                    compression_stats["precompressed"] += 1
+        except OSError:
+            pass
+    if body is None:
+        body = compress(get_cached_file(filepath, st)[1], encoding)
+
+    _, ext = os.path.splitext(filepath)
+    headers = encoded_validators(file_validators(st), encoding)
+    headers.update({"Content-Encoding": encoding, "Vary": "Accept-Encoding"})
+    variant = build_header_prefix("200 OK", len(body), MIME_TYPES[ext], headers), body
+
+    with cache_lock:
+        if key not in compressed_cache:
+            compressed_cache[key] = variant
+            compression_stats["bytes"] += len(body)
+        while compression_stats["bytes"] > COMPRESSED_CACHE_MAX_BYTES:
+            _, (_, old_body) = compressed_cache.popitem(last=False)
+            compression_stats["bytes"] -= len(old_body)
+    return variant
+
+
+def get_compression_stats():
+    with cache_lock:
+        stats = dict(compression_stats)
+        stats["entries"] = len(compressed_cache)
+    stats["encodings"] = list(ENCODINGS)
+    return stats
+
+
+def get_cached_file(filepath, st):
+    """
+    Return (header_prefix, body) for a file from the LRU cache, loading it on a miss.
+    st is a fresh os.stat of the file; an entry whose mtime or size changed is reloaded.
+    Returns None for files too large to cache, which are streamed with sendfile instead.
+    """
+    if not is_cacheable(st):
+        return None
+    with cache_lock:
+        entry = file_cache.get(filepath)
+        if entry is not None:
+            if entry[0] == st.st_mtime_ns and entry[1] == st.st_size:
+                file_cache.move_to_end(filepath)
+                cache_stats["hits"] += 1
+                return entry[2], entry[3]
+            del file_cache[filepath]
+            cache_stats["bytes"] -= entry[1]
+            cache_stats["invalidations"] += 1
+        cache_stats["misses"] += 1
+
+    with open(filepath, "rb") as f:
+        st = os.fstat(f.fileno())  # stat the file we actually read
+        body = f.read()
+    _, ext = os.path.splitext(filepath)
+    headers = dict(file_validators(st), **{"Accept-Ranges": "bytes"})
+    if MIME_TYPES[ext] in COMPRESSIBLE_TYPES:
+        headers["Vary"] = "Accept-Encoding"
+    header_prefix = build_header_prefix("200 OK", len(body), MIME_TYPES[ext], headers)
+
+    with cache_lock:
+        old = file_cache.pop(filepath, None)  # another thread may have loaded it meanwhile
+        if old is not None:
+            cache_stats["bytes"] -= old[1]
+        file_cache[filepath] = (st.st_mtime_ns, len(body), header_prefix, body)
+        cache_stats["bytes"] += len(body)
+        while cache_stats["bytes"] > CACHE_MAX_BYTES:
+            _, (_, size, _, _) = file_cache.popitem(last=False)
+            cache_stats["bytes"] -= size
+            cache_stats["evictions"] += 1
+    return header_prefix, body
+
+
+def get_cache_stats():
+    with cache_lock:
+        stats = dict(cache_stats)
+        stats["entries"] = len(file_cache)
+    stats["capacity_bytes"] = CACHE_MAX_BYTES
+    return stats
+
+
+def handle_request(path, client_ip, keep_alive=False, request_headers=None):
+    """
+    Route a request to a file, a directory listing or a 404.
+    Returns (response, body): for files streamed from disk, response holds only the headers and body
+    is (file, parts) as taken by send_response; otherwise response is complete and body is None.
+    request_headers are used for conditional GETs (If-None-Match / If-Modified-Since).
+    """
+    request_headers = request_headers or {}
+    if path == STATS_PATH:
+        body = json.dumps({
+            "pool": get_pool_stats(),
+            "file_cache": get_cache_stats(),
+            "compression": get_compression_stats(),
+            "rate_limiter": get_rate_limit_stats(),
+            "hits": get_counter_stats(),
+            "log": access_log.get_log_stats(),
+        }).encode()
+        return build_response("200 OK", body, "application/json", keep_alive), None
+
+    relative_path = path.lstrip("/")  # remove leading slash
+    filepath = os.path.join(BASE_DIR, relative_path)
+
+    try:
+        st = os.stat(filepath)
+    except (OSError, ValueError):  # ValueError: a path the OS can't represent, like an embedded NUL
+        st = None
+
+    if st is not None:
+        # only existing paths are counted: a client requesting made-up URLs would otherwise fill the
+        # fixed-size shared table, which is never swept
+        update_counter(client_ip, path)
+        if stat.S_ISREG(st.st_mode):
+            _, ext = os.path.splitext(filepath)
+            if ext in MIME_TYPES:
+                validators = file_validators(st)
+                # ranges are always served from the identity representation
+                encoding = None
+                if (MIME_TYPES[ext] in COMPRESSIBLE_TYPES and "range" not in request_headers
+                        and MIN_COMPRESS_SIZE <= st.st_size and is_cacheable(st)):
+                    encoding = choose_encoding(request_headers)
+                if encoding is not None:
+                    validators = encoded_validators(validators, encoding)
+                if is_not_modified(request_headers, validators, st.st_mtime):
+                    return build_not_modified(validators, keep_alive), None
+                if encoding is not None:
+                    header_prefix, body = get_compressed_file(filepath, st, encoding)
+                    return (header_prefix, CONNECTION_HEADERS[keep_alive], body), None
+
+                ranges = None
+                if "range" in request_headers and if_range_matches(request_headers, validators):
+                    ranges = parse_range(request_headers["range"], st.st_size)
+                if ranges == []:
+                    body = "<h1>416 Range Not Satisfiable</h1>".encode()
+                    return build_response("416 Range Not Satisfiable", body, keep_alive=keep_alive,
+                                          headers={"Content-Range": f"bytes */{st.st_size}"}), None
+
+                if ranges is None:
+                    cached = get_cached_file(filepath, st)
+                    if cached is not None:
+                        header_prefix, body = cached
+                        return (header_prefix, CONNECTION_HEADERS[keep_alive], body), None
+
+                f = open(filepath, "rb")
+                st = os.fstat(f.fileno())
+                content_type = MIME_TYPES[ext]
+                headers = dict(file_validators(st), **{"Accept-Ranges": "bytes"})
+                if content_type in COMPRESSIBLE_TYPES:
+                    headers["Vary"] = "Accept-Encoding"
+                if ranges is not None:
+                    return build_range_response(f, st.st_size, ranges, content_type, headers, keep_alive)
+                return build_headers("200 OK", st.st_size, content_type, keep_alive, headers), (f, [(0, st.st_size)])
+            else:
+                return NOT_FOUND_RESPONSES[keep_alive], None
+        elif stat.S_ISDIR(st.st_mode):
+            body = generate_directory_listing(filepath, relative_path, client_ip, st.st_mtime_ns).encode()
+            # the listing embeds per-client hit counts, so its ETag is a digest of the rendered page
+            validators = {"ETag": f'"{hashlib.sha1(body).hexdigest()[:16]}"'}
+            encoding = choose_encoding(request_headers) if len(body) >= MIN_COMPRESS_SIZE else None
+            if encoding is not None:
+                validators = encoded_validators(validators, encoding)
+            if is_not_modified(request_headers, validators):
+                return build_not_modified(validators, keep_alive), None
+            headers = dict(validators, Vary="Accept-Encoding")
+            if encoding is not None:
+                body = compress(body, encoding)
+                headers["Content-Encoding"] = encoding
+            return build_response("200 OK", body, "text/html", keep_alive, headers), None
+
+    return NOT_FOUND_RESPONSES[keep_alive], None
+
+
+def take_token(bucket, now, cost):
+    """Refill a (tokens, last_refill) bucket (None for a new client) and take cost tokens. Returns (bucket, limited)."""
+    if bucket is None:
+        return (RATE_BURST - cost, now), False
+    tokens = min(RATE_BURST, bucket[0] + (now - bucket[1]) * RATE_LIMIT)
+    if tokens < 1:
+        return (tokens, now), True  # too many requests from this IP
+    return (tokens - cost, now), False
+
+
+def is_rate_limited(client_ip, cost=1):
+    """
+    Token bucket per client IP: RATE_BURST tokens, refilled at RATE_LIMIT per second, one per request.
+    cost=0 only checks for an empty bucket, e.g. when accepting a connection before any request.
+    """
+    now = time.monotonic()  # CLOCK_MONOTONIC is system-wide, so buckets can be shared between processes
+    if shared_buckets is not None:
+        limited = shared_buckets.update(client_ip.encode(), lambda bucket: take_token(bucket, now, cost))
+        if limited is None:
+            rate_stats["table_full"] += 1
+            return False  # no room to track this client: let it through rather than lock it out
+        return limited
+    stripe = hash(client_ip) % RATE_LOCK_STRIPES
+    buckets = rate_buckets[stripe]
+    with rate_locks[stripe]:
+        buckets[client_ip], limited = take_token(buckets.get(client_ip), now, cost)
+        return limited
+
+
+def evict_idle_buckets():
+    """
+    Periodically drop buckets that have refilled completely: a full bucket behaves exactly
+    like a missing one, so this only frees memory of clients that went away.
+    """
+    refill_time = RATE_BURST / RATE_LIMIT
+    while True:
+        time.sleep(RATE_EVICT_INTERVAL)
+        now = time.monotonic()
+        if shared_buckets is not None:
+            rate_stats["evicted"] += shared_buckets.sweep(lambda bucket: now - bucket[1] < refill_time)
+            continue
+        for lock, buckets in zip(rate_locks, rate_buckets):
+            with lock:
+                idle = [ip for ip, (_, last) in buckets.items() if now - last >= refill_time]
+                for ip in idle:
+                    del buckets[ip]
+            rate_stats["evicted"] += len(idle)
+
+
+def start_rate_limit_evictor():
+    if shared_buckets is not None:
+        return  # the prefork supervisor sweeps the shared table
+    threading.Thread(target=evict_idle_buckets, name="RateLimitEvictor", daemon=True).start()
+
+
+def get_rate_limit_stats():
+    if shared_buckets is not None:
+        clients = len(shared_buckets.items())
+    else:
+        clients = sum(len(buckets) for buckets in rate_buckets)
+    return {
+        "clients": clients,
+        "evicted": rate_stats["evicted"],
+        "table_full": rate_stats["table_full"],
+        "rate": RATE_LIMIT,
+        "burst": RATE_BURST,
+    }
+
+
+def worker():
+    while True:
+        conn, addr, enqueued_at = connection_queue.get()
+        waited = time.monotonic() - enqueued_at
+        with stats_lock:
+            pool_stats["wait_total"] += waited
+            pool_stats["wait_max"] = max(pool_stats["wait_max"], waited)
+            recent_waits.append(waited)
+        try:
+            handle_client(conn, addr)  # closes conn on the way out, also when it raises
+        except OSError as e:
+            access_log.log("error", "connection failed", client=f"{addr[0]}:{addr[1]}",
+                           thread=threading.current_thread().name, error=str(e))
+        except Exception as e:
+            # a bug in request handling must not cost the pool a worker: nothing would replace it
+            access_log.log("error", "request handler crashed", client=f"{addr[0]}:{addr[1]}",
+                           thread=threading.current_thread().name, error=f"{type(e).__name__}: {e}")
+
+
+def get_pool_stats():
+    with stats_lock:
+        stats = dict(pool_stats)
+        waits = sorted(recent_waits)
+    dequeued = stats["accepted"] - connection_queue.qsize()
+    stats["workers"] = WORKER_THREADS
+    stats["queue_depth"] = connection_queue.qsize()
+    stats["queue_capacity"] = ACCEPT_QUEUE_SIZE
+    stats["wait_avg"] = stats["wait_total"] / dequeued if dequeued > 0 else 0.0
+    stats["wait_p50"] = waits[int(len(waits) * 0.50)] if waits else 0.0
+    stats["wait_p99"] = waits[int(len(waits) * 0.99)] if waits else 0.0
+    return stats
+
+
+def create_listener(reuse_port=False):
+    """Listening socket on HOST:PORT; with reuse_port, several processes can each bind their own."""
+    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuse_port:
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    s.bind((HOST, PORT))
+    s.listen(ACCEPT_QUEUE_SIZE)
+    return s
+
+
+def serve(listener):
+    """Threaded engine: accept on listener and hand connections to the worker pool."""
+    access_log.start_logger()
+    start_rate_limit_evictor()
+    for i in range(WORKER_THREADS):
+        threading.Thread(target=worker, name=f"Worker-{i}", daemon=True).start()
+
+    with listener as s:
+        access_log.log("info", "serving", url=f"http://localhost:{PORT}", engine="threaded", workers=WORKER_THREADS,
+                       pid=os.getpid())
         while True:
             conn, addr = s.accept()
             client_ip = addr[0]
-            if is_rate_limited(client_ip):
-                response = build_response(
-                    "429 Too Many Requests",
-                    b"<h1>429 Too Many Requests</h1><p>Rate limit exceeded. Please try again later.</p>"
-                )
-                conn.sendall(response)
+            if is_rate_limited(client_ip, cost=0):
+                send_buffers(conn, TOO_MANY_REQUESTS_RESPONSE)
                 conn.close()
+                access_log.log("warning", "rejected", client=client_ip, status=429)
                 continue
-            thread = threading.Thread(target=handle_client, args=(conn, addr))
-            thread.start()
+            try:
+                connection_queue.put_nowait((conn, addr, time.monotonic()))
+            except queue.Full:
+                with stats_lock:
+                    pool_stats["rejected"] += 1
+                send_buffers(conn, SERVICE_UNAVAILABLE_RESPONSE)
+                conn.close()
+                access_log.log("warning", "rejected", client=client_ip, status=503)
+                continue
+            with stats_lock:
+                pool_stats["accepted"] += 1
+                pool_stats["max_queue_depth"] = max(pool_stats["max_queue_depth"], connection_queue.qsize())
+
+
+def run_engine(listener):
+    if ENGINE == "asyncio":
+        import async_server
+        async_server.main(listener)
+    elif ENGINE == "reactor":
+        import single_threaded_server
+        single_threaded_server.main(listener)
+    else:
+        serve(listener)
+
+
+def main():
+    if WORKER_PROCESSES > 1:
+        import prefork
+        prefork.main()
+        return
+    run_engine(create_listener())
 
 
 if __name__ == "__main__":
@@ -0,0 +1,113 @@
+import hashlib
+import multiprocessing
+import struct
+from multiprocessing import shared_memory
+
+# Fixed-size hash table in a multiprocessing.shared_memory block, for state that several worker
+# processes must agree on (see prefork.py). It is created before the workers fork, so they all map
+# the same memory and share the same locks.
+#
+# Keys are bytes, identified by a 64-bit blake2b fingerprint (0 marks an empty slot); the key itself
+# is stored next to the values, truncated to key_size, only so the table can be listed. The table is
+# split into `stripes` segments, each an open-addressing table with linear probing under its own
+# process-shared lock: a key always lives in the segment picked by its fingerprint, so two processes
+# updating keys of different segments never wait for each other.
+#
+# A multiprocessing.Lock is a bare semaphore with no owner: if a worker dies while holding one (SIGKILL,
+# the OOM killer), it is never released, and every process that touches that segment blocks for good.
+# The supervisor's restart doesn't help, since the new worker maps the same locks; only restarting the
+# whole server recovers.
+
+
+class SharedTable:
+    def __init__(self, slots, value_format, key_size=64, stripes=64):
+        self.entry = struct.Struct(f"=Q{value_format}{key_size}s")  # fingerprint, values..., key
+        self.segment_slots = max(1, slots // stripes)
+        self.stripes = stripes
+        self.slots = self.segment_slots * stripes
+        self.shm = shared_memory.SharedMemory(create=True, size=self.slots * self.entry.size)
+        self.buffer = self.shm.buf
+        self.locks = [multiprocessing.Lock() for _ in range(stripes)]
+
+    @staticmethod
+    def fingerprint(key):
+        return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "little") or 1
+
+    def _find(self, fp):
+        """Offset of fp's slot in its segment, or of the first free slot, or None if the segment is full."""
+        segment = fp % self.stripes
+        first = segment * self.segment_slots
+        home = (fp // self.stripes) % self.segment_slots
+        size = self.entry.size
+        for i in range(self.segment_slots):
+            offset = (first + (home + i) % self.segment_slots) * size
+            slot_fp = int.from_bytes(self.buffer[offset:offset + 8], "little")
+            if slot_fp == fp or slot_fp == 0:
+                return offset
+        return None
+
+    def update(self, key, fn):
+        """
+        Atomically replace the values stored under key with fn(values), where values is None for a new
+        key; fn returns (new_values, result) and result must not be None. Returns result, or None
+        without calling fn if the key is new and its segment is full.
+        """
+        fp = self.fingerprint(key)
+        with self.locks[fp % self.stripes]:
+            offset = self._find(fp)
+            if offset is None:
+                return None
+            slot = self.entry.unpack_from(self.buffer, offset)
+            values, result = fn(slot[1:-1] if slot[0] == fp else None)
+            self.entry.pack_into(self.buffer, offset, fp, *values, key)
+            return result
+
+    def get(self, key):
+        """Values stored under key, or None."""
+        fp = self.fingerprint(key)
+        with self.locks[fp % self.stripes]:
+            offset = self._find(fp)
+            if offset is None:
+                return None
+            slot = self.entry.unpack_from(self.buffer, offset)
+            return slot[1:-1] if slot[0] == fp else None
+
+    def _segment(self, segment):
+        first = segment * self.segment_slots * self.entry.size
+        return [self.entry.unpack_from(self.buffer, first + i * self.entry.size) for i in range(self.segment_slots)]
+
+    def items(self):
+        """List of (key, values) for all entries; keys longer than key_size come back truncated."""
+        entries = []
+        for segment in range(self.stripes):
+            with self.locks[segment]:
+                slots = self._segment(segment)
+            entries += [(slot[-1].rstrip(b"\0"), slot[1:-1]) for slot in slots if slot[0]]
+        return entries
+
+    def sweep(self, keep):
+        """
+        Drop every entry whose values fail keep(values) and return how many were dropped. Each
+        segment is rebuilt under its lock, since open addressing can't just blank a slot.
+        """
+        removed = 0
+        size = self.entry.size
+        for segment in range(self.stripes):
+            with self.locks[segment]:
+                slots = [slot for slot in self._segment(segment) if slot[0]]
+                kept = [slot for slot in slots if keep(slot[1:-1])]
+                if len(kept) == len(slots):
+                    continue
+                removed += len(slots) - len(kept)
+                first = segment * self.segment_slots * size
+                self.buffer[first:first + self.segment_slots * size] = bytes(self.segment_slots * size)
+                for slot in kept:
+                    offset = self._find(slot[0])
+                    self.entry.pack_into(self.buffer, offset, *slot)
+        return removed
+
+    def destroy(self):
+        """Release the shared memory; only the process that created the table calls this, on exit."""
+        self.buffer = None
+        self.shm.close()
+        self.shm.unlink()
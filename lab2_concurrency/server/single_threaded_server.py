@@ -1,104 +1,279 @@
-import socket
+import heapq
+import itertools
 import os
+import selectors
 import time
 
-HOST = "0.0.0.0"
-PORT = 8080
-BASE_DIR = os.path.join(os.path.dirname(__file__), "content")
+from server import (
+    PORT, KEEP_ALIVE_TIMEOUT, MAX_KEEP_ALIVE_REQUESTS, MAX_HEADER_SIZE, GATHER_MIN_BYTES,
+    TOO_MANY_REQUESTS_RESPONSE, build_error_response, wants_keep_alive, handle_request, is_rate_limited,
+    start_rate_limit_evictor, response_size, create_listener,
+)
+from http_parser import RequestParser, HttpError
+from latency import delay_for
+import access_log
 
-MIME_TYPES = {
-    ".html": "text/html",
-    ".png": "image/png",
-    ".pdf": "application/pdf",
-}
+# Single-threaded reactor: one thread multiplexes every connection with selectors (epoll on Linux).
+# Each connection is a small state machine:
+#
+#   READING  waiting for a complete request; pipelined requests already buffered are taken first
+#   DELAYED  simulated latency (latency.py) is running as a timer, the connection is not polled
+#   WRITING  the response is being flushed; file slices go out with os.sendfile at their offsets
+#
+# Routing, caching, the hit counter and rate limiting are the same as in server.py, so this is a
+# single-core baseline for the threaded and asyncio engines. No call ever blocks: a slow client
+# only holds its own connection, never the loop. Connections that make no progress for
+# KEEP_ALIVE_TIMEOUT seconds are closed. An exception while serving a connection is logged and
+# costs only that connection (a 500 if nothing was sent yet), never the loop.
 
-hit_counter = {}
+READING, DELAYED, WRITING = "reading", "delayed", "writing"
+RECV_SIZE = 65536
 
 
-def get_mime_type(filename):
-    _, ext = os.path.splitext(filename)
-    return MIME_TYPES.get(ext, "application/octet-stream")
+class Connection:
+    def __init__(self, sock, addr):
+        self.sock = sock
+        self.addr = addr
+        self.client_ip = addr[0]
+        self.parser = RequestParser(MAX_HEADER_SIZE)
+        self.state = READING
+        self.events = 0  # selector events currently registered
+        self.served = 0
+        self.request = None
+        self.started = 0.0
+        self.keep_alive = False
+        self.out = []  # bytes buffers and (offset, count) slices of self.file, in order
+        self.file = None
+        self.sent = 0
+        self.status = 0
+        self.deadline = 0.0
+        self.closed = False
 
 
-def build_response(status, body, content_type="text/html"):
-    response = f"HTTP/1.1 {status}\r\n"
-    response += f"Content-Type: {content_type}\r\n"
-    response += f"Content-Length: {len(body)}\r\n"
-    response += "Connection: close\r\n\r\n"
-    response = response.encode() + body
-    return response
+class Reactor:
+    def __init__(self, listener):
+        self.listener = listener
+        self.listener.setblocking(False)
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(listener, selectors.EVENT_READ)
+        self.timers = []  # heap of (due, seq, callback, conn)
+        self.seq = itertools.count()
 
+    def call_at(self, due, callback, conn):
+        heapq.heappush(self.timers, (due, next(self.seq), callback, conn))
 
-def generate_directory_listing(path, relative_path, client_ip):
-    items = os.listdir(path)
-    html = f"<html><head><title>Directory listing for /{relative_path}</title></head><body>"
-    html += f"<h2>Directory listing for /{relative_path}</h2>"
-    html += "<table border='1'><tr><th>File / Directory</th><th>Hits</th></tr>"
-
-    if relative_path:
-        parent_path = os.path.dirname(relative_path.rstrip('/'))
-        html += f'<tr><td><a href="/{parent_path}">../</a></td><td></td></tr>'
-
-    for item in items:
-        if item.startswith("."):
-            continue
-        item_path = os.path.join(path, item)
-        display_name = item + '/' if os.path.isdir(item_path) else item
-        if relative_path:
-            url = f"/{relative_path}/{item}".replace("//", "/")
+    def set_events(self, conn, events):
+        if events == conn.events or conn.closed:
+            return
+        if not events:
+            self.selector.unregister(conn.sock)
+        elif not conn.events:
+            self.selector.register(conn.sock, events, conn)
         else:
-            url = f"/{item}"
+            self.selector.modify(conn.sock, events, conn)
+        conn.events = events
 
-        # Get hit count for this file
-        hits = hit_counter.get(client_ip, {}).get(url, 0)
-        html += f'<tr><td><a href="{url}">{display_name}</a></td><td>{hits}</td></tr>'
+    def touch(self, conn):
+        """The connection made progress: push back its inactivity deadline."""
+        conn.deadline = time.monotonic() + KEEP_ALIVE_TIMEOUT
+        self.call_at(conn.deadline, self.check_idle, conn)
 
-    html += "</body></html>"
-    return html
+    def check_idle(self, conn):
+        # the heap holds one entry per touch; only the latest deadline counts
+        if conn.state != DELAYED and time.monotonic() >= conn.deadline:
+            self.close(conn)
 
+    def close(self, conn):
+        if conn.closed:
+            return
+        self.set_events(conn, 0)
+        conn.closed = True
+        if conn.file is not None:
+            conn.file.close()
+            conn.file = None
+        conn.sock.close()
 
-def main():
-    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-        s.bind((HOST, PORT))
-        s.listen(1)
-        print(f"Serving on http://localhost:{PORT}")
+    def accept(self):
         while True:
-            conn, addr = s.accept()
-            with conn:
-                print(f"Connected by {addr}")
-                request = conn.recv(1024).decode("utf-8")  # receive the http req
-                print(f"Request:\n{request}")
+            try:
+                sock, addr = self.listener.accept()
+            except BlockingIOError:
+                return
+            except OSError:
+                return  # e.g. EMFILE: leave the rest in the backlog until a connection closes
+            sock.setblocking(False)
+            if is_rate_limited(addr[0], cost=0):
+                try:
+                    sock.send(b"".join(TOO_MANY_REQUESTS_RESPONSE))
+                except OSError:
+                    pass
+                sock.close()
+                access_log.log("warning", "rejected", client=addr[0], status=429)
+                continue
+            conn = Connection(sock, addr)
+            access_log.log("debug", "connected", client=f"{addr[0]}:{addr[1]}")
+            self.set_events(conn, selectors.EVENT_READ)
+            self.touch(conn)
 
-                if not request:
-                    continue
+    def on_readable(self, conn):
+        try:
+            data = conn.sock.recv(RECV_SIZE)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b""
+        if not data:
+            self.close(conn)
+            return
+        conn.parser.feed(data)
+        self.touch(conn)
+        self.process(conn)
+
+    def process(self, conn):
+        """Serve buffered requests in order until one has to wait for data, a timer or a writable socket."""
+        while conn.state == READING and not conn.closed:
+            try:
+                request = conn.parser.next_request()
+            except HttpError as e:
+                conn.request = None
+                conn.started = time.perf_counter()
+                self.respond(conn, build_error_response(e.status), None, int(e.status[:3]), keep_alive=False)
+                return
+            if request is None:
+                self.set_events(conn, selectors.EVENT_READ)
+                return
+            conn.request = request
+            conn.started = time.perf_counter()
+            conn.served += 1
+            access_log.log("debug", "request", client=conn.client_ip, head=request.head)
+
+            if is_rate_limited(conn.client_ip):
+                self.respond(conn, TOO_MANY_REQUESTS_RESPONSE, None, 429, keep_alive=False)
+                return
+            conn.keep_alive = (wants_keep_alive(request.version, request.headers)
+                               and conn.served < MAX_KEEP_ALIVE_REQUESTS)
+            delay = delay_for(request.path)
+            if delay:
+                conn.state = DELAYED  # simulated backend latency, see latency.py
+                self.set_events(conn, 0)
+                self.call_at(time.monotonic() + delay, self.resume, conn)
+                return
+            self.handle(conn)
+
+    def handle(self, conn):
+        try:
+            response, body = handle_request(conn.request.path, conn.client_ip, conn.keep_alive,
+                                            conn.request.headers)
+        except Exception as e:  # e.g. PermissionError, or a file removed between stat and open
+            self.log_failure(conn, e)
+            self.respond(conn, build_error_response("500 Internal Server Error"), None, 500, keep_alive=False)
+            return
+        self.respond(conn, response, body, int(response[0][9:12]), conn.keep_alive)
+
+    def log_failure(self, conn, error):
+        access_log.log("error", "request handler crashed", client=f"{conn.addr[0]}:{conn.addr[1]}",
+                       error=f"{type(error).__name__}: {error}")
+
+    def guarded(self, callback, conn):
+        """Run a per-connection callback; if it raises, log it and drop only that connection."""
+        try:
+            callback(conn)
+        except Exception as e:
+            self.log_failure(conn, e)
+            self.close(conn)
+
+    def resume(self, conn):
+        """Timer callback once a delayed request's simulated latency is over."""
+        self.handle(conn)
+        self.process(conn)
+
+    def respond(self, conn, response, body, status, keep_alive):
+        conn.state = WRITING
+        conn.keep_alive = keep_alive
+        conn.status = status
+        conn.sent = response_size(response, body)
+        conn.out = [b"".join(response)] if len(response[-1]) < GATHER_MIN_BYTES else list(response)
+        if body is not None:
+            conn.file, parts = body
+            conn.out += parts
+        self.touch(conn)
+        self.flush(conn)
 
-                time.sleep(1)
-
-                path = request.split(" ")[1]
-                relative_path = path.lstrip("/")  # remove leading slash
-                filepath = os.path.join(BASE_DIR, relative_path)
-
-                if os.path.exists(filepath):
-                    if os.path.isfile(filepath):
-                        _, ext = os.path.splitext(filepath)
-                        if ext in MIME_TYPES:
-                            with open(filepath, "rb") as f:
-                                body = f.read()
-                            content_type = MIME_TYPES[ext]
-                            response = build_response("200 OK", body, content_type)
-                            conn.sendall(response)
-                        else:
-                            body = "<h1>404 Not Found</h1>".encode()
-                            response = build_response("404 Not Found", body)
-                            conn.sendall(response)
-                    elif os.path.isdir(filepath):
-                        listing_html = generate_directory_listing(filepath, relative_path)
-                        response = build_response("200 OK", listing_html.encode(), "text/html")
-                        conn.sendall(response)
+    def flush(self, conn):
+        """Write as much of conn.out as the socket takes; wait for EVENT_WRITE if it fills up."""
+        sock = conn.sock
+        try:
+            while conn.out:
+                item = conn.out[0]
+                if isinstance(item, tuple):
+                    offset, count = item
+                    sent = os.sendfile(sock.fileno(), conn.file.fileno(), offset, count)
+                    if sent == 0:
+                        raise ConnectionError("file shrank while sending")
+                    conn.out[0] = (offset + sent, count - sent) if sent < count else None
                 else:
-                    body = "<h1>404 Not Found</h1>".encode()
-                    response = build_response("404 Not Found", body)
-                    conn.sendall(response)
+                    sent = sock.send(item)
+                    conn.out[0] = memoryview(item)[sent:] if sent < len(item) else None
+                if conn.out[0] is None:
+                    del conn.out[0]
+                else:
+                    self.touch(conn)
+        except BlockingIOError:
+            self.set_events(conn, selectors.EVENT_WRITE)
+            return
+        except OSError:
+            self.close(conn)
+            return
+        self.finish(conn)
+
+    def flush_and_continue(self, conn):
+        self.flush(conn)
+        self.process(conn)
+
+    def finish(self, conn):
+        request = conn.request
+        access_log.access(conn.client_ip, request.method if request else "-", request.path if request else "-",
+                          conn.status, conn.sent, conn.started)
+        if conn.file is not None:
+            conn.file.close()
+            conn.file = None
+        if not conn.keep_alive:
+            self.close(conn)
+            return
+        conn.state = READING  # process() goes on with the next pipelined request, if any
+        conn.request = None
+        self.touch(conn)
+
+    def run_timers(self):
+        now = time.monotonic()
+        while self.timers and self.timers[0][0] <= now:
+            _, _, callback, conn = heapq.heappop(self.timers)
+            if not conn.closed:
+                self.guarded(callback, conn)
+
+    def run(self):
+        while True:
+            timeout = max(0.0, self.timers[0][0] - time.monotonic()) if self.timers else None
+            for key, mask in self.selector.select(timeout):
+                if key.data is None:
+                    self.accept()
+                    continue
+                conn = key.data
+                if conn.closed:
+                    continue
+                if mask & selectors.EVENT_READ and conn.state == READING:
+                    self.guarded(self.on_readable, conn)
+                elif mask & selectors.EVENT_WRITE and conn.state == WRITING:
+                    self.guarded(self.flush_and_continue, conn)
+            self.run_timers()
+
+
+def main(listener=None):
+    access_log.start_logger()
+    start_rate_limit_evictor()
+    listener = listener or create_listener()
+    access_log.log("info", "serving", url=f"http://localhost:{PORT}", engine="reactor", pid=os.getpid())
+    Reactor(listener).run()
 
 
 if __name__ == "__main__":
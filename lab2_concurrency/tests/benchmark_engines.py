@@ -0,0 +1,112 @@
+import asyncio
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+# Side-by-side benchmark of the threaded, asyncio and reactor engines of server/server.py.
+# For each engine it holds IDLE_CONNECTIONS idle keep-alive connections open and then measures
+# how long a fresh client waits for a response, and what throughput CLIENTS keep-alive clients get.
+
+SERVER = os.path.join(os.path.dirname(__file__), "..", "server", "server.py")
+ENGINES = {"threaded": 8090, "asyncio": 8091, "reactor": 8092}
+
+IDLE_CONNECTIONS = 2000
+CLIENTS = 50
+REQUESTS_PER_CLIENT = 20
+URL_PATH = "/index.html"
+
+
+def start_server(engine, port):
+    env = dict(os.environ, ENGINE=engine, PORT=str(port), LATENCY="", RATE_LIMIT="1000000",
+               KEEP_ALIVE_TIMEOUT="60", MAX_KEEP_ALIVE_REQUESTS="1000000")
+    process = subprocess.Popen([sys.executable, SERVER], env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    time.sleep(1)  # give the server time to start
+    return process
+
+
+async def get(reader, writer, close=False):
+    connection = "close" if close else "keep-alive"
+    writer.write(f"GET {URL_PATH} HTTP/1.1\r\nHost: localhost\r\nConnection: {connection}\r\n\r\n".encode())
+    await writer.drain()
+    head = await reader.readuntil(b"\r\n\r\n")
+    status = int(head.split(b" ")[1])
+    length = 0
+    for line in head.split(b"\r\n"):
+        if line.lower().startswith(b"content-length:"):
+            length = int(line.split(b":")[1])
+    await reader.readexactly(length)
+    return status
+
+
+async def open_idle_connections(port, count):
+    connections = []
+    for _ in range(count):
+        try:
+            connections.append(await asyncio.open_connection("localhost", port))
+        except OSError:
+            break
+    return connections
+
+
+async def timed_probe(port, timeout=10):
+    start = time.time()
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection("localhost", port), timeout)
+        status = await asyncio.wait_for(get(reader, writer, close=True), timeout)
+        writer.close()
+    except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+        status = None
+    return time.time() - start, status
+
+
+async def keep_alive_client(port, latencies):
+    reader, writer = await asyncio.open_connection("localhost", port)
+    for _ in range(REQUESTS_PER_CLIENT):
+        start = time.time()
+        if await get(reader, writer) == 200:
+            latencies.append(time.time() - start)
+    writer.close()
+
+
+async def benchmark(engine, port):
+    print(f"\n{engine} engine on port {port}")
+
+    latencies = []
+    start = time.time()
+    await asyncio.gather(*(keep_alive_client(port, latencies) for _ in range(CLIENTS)),
+                         return_exceptions=True)
+    total_time = time.time() - start
+    latencies.sort()
+    print(f"  {CLIENTS} keep-alive clients x {REQUESTS_PER_CLIENT} requests: "
+          f"{len(latencies) / total_time:.0f} req/s")
+    if latencies:
+        print(f"  latency p50 {statistics.median(latencies) * 1000:.2f} ms, "
+              f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.2f} ms")
+
+    idle = await open_idle_connections(port, IDLE_CONNECTIONS)
+    print(f"  opened {len(idle)}/{IDLE_CONNECTIONS} idle connections")
+    elapsed, status = await timed_probe(port)
+    print(f"  fresh request while idle connections are held: status {status} in {elapsed * 1000:.2f} ms")
+    for _, writer in idle:
+        writer.close()
+
+
+def main():
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+    for engine, port in ENGINES.items():
+        process = start_server(engine, port)
+        try:
+            asyncio.run(benchmark(engine, port))
+        finally:
+            process.terminate()
+            process.wait(timeout=5)
+
+
+if __name__ == "__main__":
+    main()
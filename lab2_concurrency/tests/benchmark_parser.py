@@ -0,0 +1,65 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "server"))
+
+from http_parser import RequestParser
+
+# Requests/sec of pure request parsing (no sockets) for the incremental parser in
+# server/http_parser.py, with the input arriving in differently sized pieces.
+
+BROWSER_REQUEST = (
+    b"GET /subdir/images/ss1.png HTTP/1.1\r\n"
+    b"Host: localhost:8080\r\n"
+    b"User-Agent: Mozilla/5.0 (X11; Linux x86_64; rv:128.0) Gecko/20100101 Firefox/128.0\r\n"
+    b"Accept: image/avif,image/webp,image/png,image/svg+xml,image/*;q=0.8,*/*;q=0.5\r\n"
+    b"Accept-Language: en-US,en;q=0.5\r\n"
+    b"Accept-Encoding: gzip, deflate, br, zstd\r\n"
+    b"Connection: keep-alive\r\n"
+    b"Referer: http://localhost:8080/subdir/images\r\n"
+    b"If-None-Match: \"18791d75d4278a00-13d63\"\r\n"
+    b"\r\n"
+)
+CHUNKED_REQUEST = (
+    b"POST /upload HTTP/1.1\r\n"
+    b"Host: localhost:8080\r\n"
+    b"Transfer-Encoding: chunked\r\n"
+    b"\r\n"
+    b"10\r\n0123456789abcdef\r\n"
+    b"10\r\n0123456789abcdef\r\n"
+    b"0\r\n\r\n"
+)
+
+
+def run(name, request, count, piece_size=None):
+    """Parse count pipelined copies of request, fed in pieces of piece_size bytes (None = one request each)."""
+    stream = request * count
+    if piece_size is None:
+        pieces = [request] * count
+    else:
+        pieces = [stream[i:i + piece_size] for i in range(0, len(stream), piece_size)]
+
+    parser = RequestParser()
+    parsed = 0
+    start = time.perf_counter()
+    for piece in pieces:
+        parser.feed(piece)
+        while parser.next_request() is not None:
+            parsed += 1
+    elapsed = time.perf_counter() - start
+    assert parsed == count, f"{name}: parsed {parsed} of {count}"
+    print(f"{name:<45} {count / elapsed:>12,.0f} req/s")
+
+
+def main():
+    print(f"{'scenario':<45} {'throughput':>16}")
+    run("browser GET, one request per recv", BROWSER_REQUEST, 200_000)
+    run("browser GET, pipelined in 64 KB recvs", BROWSER_REQUEST, 200_000, 65536)
+    run("browser GET, split into 100-byte segments", BROWSER_REQUEST, 100_000, 100)
+    run("browser GET, one byte at a time", BROWSER_REQUEST, 2_000, 1)
+    run("chunked POST, pipelined in 64 KB recvs", CHUNKED_REQUEST, 100_000, 65536)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import os
+import socket
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "server"))
+
+from server import build_response, send_buffers, NOT_FOUND_RESPONSES
+
+# Responses/sec of building and writing responses over a local socket pair: the old string-
+# concatenating build_response + sendall against the bytes-level builder, the prebuilt 404 and
+# send_buffers (scatter/gather sendmsg above GATHER_MIN_BYTES) in server/server.py.
+
+SMALL_BODY = b"<h1>hello</h1>" * 30  # about the size of a directory listing
+LARGE_BODY = b"x" * (1024 * 1024)  # a cached file
+HEADERS = {"ETag": '"18791d75d4278a00-13d63"', "Last-Modified": "Tue, 18 Nov 2025 10:00:00 GMT",
+           "Accept-Ranges": "bytes", "Vary": "Accept-Encoding"}
+
+
+def legacy_build_response(status, body, content_type="text/html", headers=None):
+    response = f"HTTP/1.1 {status}\r\n"
+    response += f"Content-Type: {content_type}\r\n"
+    response += f"Content-Length: {len(body)}\r\n"
+    for name, value in (headers or {}).items():
+        response += f"{name}: {value}\r\n"
+    response += "Connection: close\r\n\r\n"
+    return response.encode() + body
+
+
+def drain(sock):
+    while sock.recv(1 << 20):
+        pass
+
+
+def run(name, make, send, count):
+    sender, receiver = socket.socketpair()
+    reader = threading.Thread(target=drain, args=(receiver,), daemon=True)
+    reader.start()
+    start = time.perf_counter()
+    for _ in range(count):
+        send(sender, make())
+    elapsed = time.perf_counter() - start
+    sender.close()
+    reader.join()
+    receiver.close()
+    print(f"{name:<50} {count / elapsed:>12,.0f} resp/s")
+
+
+def main():
+    print(f"{'scenario':<50} {'throughput':>17}")
+    for label, body, count in (("small body", SMALL_BODY, 200_000), ("1 MB body", LARGE_BODY, 2_000)):
+        run(f"{label}: legacy build + sendall", lambda: legacy_build_response("200 OK", body, headers=HEADERS),
+            socket.socket.sendall, count)
+        run(f"{label}: bytes builder + send_buffers", lambda: build_response("200 OK", body, headers=HEADERS),
+            send_buffers, count)
+    run("404: legacy build + sendall", lambda: legacy_build_response("404 Not Found", b"<h1>404 Not Found</h1>"),
+        socket.socket.sendall, 200_000)
+    run("404: prebuilt + send_buffers", lambda: NOT_FOUND_RESPONSES[False], send_buffers, 200_000)
+
+
+if __name__ == "__main__":
+    main()
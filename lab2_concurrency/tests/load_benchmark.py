@@ -0,0 +1,295 @@
+import argparse
+import asyncio
+import collections
+import json
+import os
+import platform
+import resource
+import socket
+import subprocess
+import sys
+import time
+
+# Reproducible load benchmark for the server engines. Every run starts a fresh server process on an
+# ephemeral port, then drives it with an open-loop load generator: requests are scheduled at a fixed
+# target rate no matter how fast the server answers, over a fixed number of keep-alive connections.
+# Latency is measured from the time a request was scheduled, not from when a free connection picked
+# it up, so a stalled server shows up in the tail instead of silently lowering the offered load
+# (coordinated omission). Results go to a JSON file for regression tracking:
+#
+#   python tests/load_benchmark.py --engines threaded,reactor --rps 500,2000 --concurrency 10,100
+#
+# The generator is a single asyncio process; on a small machine it competes with the server for CPU,
+# so compare runs made on the same host, and check "late_ms" (how far the generator fell behind its
+# schedule) before trusting a high-rate result.
+
+SERVER = os.path.join(os.path.dirname(__file__), "..", "server", "server.py")
+ENGINES = {
+    "threaded": {"ENGINE": "threaded"},
+    "asyncio": {"ENGINE": "asyncio"},
+    "reactor": {"ENGINE": "reactor"},
+    "prefork": {"ENGINE": "threaded", "WORKER_PROCESSES": "4"},
+}
+BASE_ENV = {"LATENCY": "", "RATE_LIMIT": "1000000", "KEEP_ALIVE_TIMEOUT": "60",
+            "MAX_KEEP_ALIVE_REQUESTS": "1000000", "LOG_LEVEL": "warning"}
+STARTUP_TIMEOUT = 10  # seconds to wait for the server to accept connections
+DRAIN_TIMEOUT = 10  # seconds to wait for outstanding responses after the schedule ends
+PERCENTILES = {"p50": 50, "p90": 90, "p99": 99, "p999": 99.9}
+
+
+class Histogram:
+    """
+    Latency histogram with HdrHistogram-style log-linear buckets: a value in microseconds keeps its
+    SIGNIFICANT_BITS highest bits, so every bucket is within 1/128 of the values it holds and memory
+    stays bounded however many requests are recorded.
+    """
+    SIGNIFICANT_BITS = 8
+
+    def __init__(self):
+        self.counts = collections.Counter()  # bucket lower bound -> count
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def bucket(self, value):
+        shift = max(0, value.bit_length() - self.SIGNIFICANT_BITS)
+        return value >> shift << shift, 1 << shift
+
+    def record(self, seconds):
+        value = int(seconds * 1_000_000)
+        self.counts[self.bucket(value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def percentile(self, percent):
+        """Highest value equivalent to the given percentile, in microseconds."""
+        if not self.count:
+            return 0
+        rank = max(1, round(percent / 100 * self.count))
+        seen = 0
+        for (low, width), count in sorted(self.counts.items()):
+            seen += count
+            if seen >= rank:
+                return min(low + width - 1, self.max)
+        return self.max
+
+    def summary(self):
+        """Latency percentiles, mean and max in milliseconds."""
+        result = {name: self.percentile(percent) / 1000 for name, percent in PERCENTILES.items()}
+        result["mean"] = self.total / self.count / 1000 if self.count else 0
+        result["max"] = self.max / 1000
+        return result
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("localhost", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(engine, port, latency):
+    env = dict(os.environ, **BASE_ENV, **ENGINES[engine], PORT=str(port))
+    if latency:
+        env["LATENCY"] = latency
+    process = subprocess.Popen([sys.executable, SERVER], env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline and process.poll() is None:
+        try:
+            socket.create_connection(("localhost", port), timeout=1).close()
+            return process
+        except OSError:
+            time.sleep(0.05)
+    stop_server(process)
+    raise RuntimeError(f"{engine} server did not start on port {port}")
+
+
+def stop_server(process):
+    process.terminate()
+    try:
+        process.wait(timeout=5)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+async def read_response(reader):
+    """Read one response; returns (status, server closes the connection)."""
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.split(b"\r\n")
+    status = int(lines[0].split(b" ")[1])
+    length = 0
+    close = False
+    for line in lines[1:]:
+        name, _, value = line.partition(b":")
+        name = name.strip().lower()
+        if name == b"content-length":
+            length = int(value)
+        elif name == b"connection":
+            close = value.strip().lower() == b"close"
+    await reader.readexactly(length)
+    return status, close
+
+
+class LoadGenerator:
+    def __init__(self, port, path, concurrency):
+        self.port = port
+        self.request = f"GET {path} HTTP/1.1\r\nHost: localhost\r\nConnection: keep-alive\r\n\r\n".encode()
+        self.concurrency = concurrency
+        self.pool = asyncio.Queue()
+        self.reset()
+
+    def reset(self):
+        self.histogram = Histogram()
+        self.statuses = collections.Counter()
+        self.errors = 0
+        self.late = 0.0  # worst lag of the scheduler behind the intended send time
+
+    async def connect(self):
+        for _ in range(self.concurrency):
+            self.pool.put_nowait(await asyncio.open_connection("localhost", self.port))
+
+    async def close(self):
+        while not self.pool.empty():
+            _, writer = self.pool.get_nowait()
+            if writer is not None:
+                writer.close()
+
+    async def send(self, intended):
+        reader, writer = await self.pool.get()  # (None, None) is a slot that reconnects on use
+        close = True
+        try:
+            if reader is None:
+                reader, writer = await asyncio.open_connection("localhost", self.port)
+            writer.write(self.request)
+            status, close = await read_response(reader)
+        except (OSError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+            self.errors += 1
+        else:
+            self.histogram.record(asyncio.get_running_loop().time() - intended)
+            self.statuses[status] += 1
+        finally:  # also on cancellation, so the pool never loses a slot
+            if close:
+                if writer is not None:
+                    writer.close()
+                reader = writer = None
+            self.pool.put_nowait((reader, writer))
+
+    async def run(self, rps, duration):
+        """Offer rps requests per second for duration seconds; returns (elapsed, unfinished requests)."""
+        loop = asyncio.get_running_loop()
+        interval = 1 / rps
+        pending = set()
+        start = loop.time()
+        for i in range(int(rps * duration)):
+            intended = start + i * interval
+            delay = intended - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                self.late = max(self.late, -delay)
+            task = asyncio.create_task(self.send(intended))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+        if pending:
+            _, unfinished = await asyncio.wait(set(pending), timeout=DRAIN_TIMEOUT)
+            for task in unfinished:
+                task.cancel()
+            pending = unfinished
+        return loop.time() - start, len(pending)
+
+
+async def measure(port, path, rps, concurrency, duration, warmup):
+    generator = LoadGenerator(port, path, concurrency)
+    await generator.connect()
+    try:
+        if warmup:
+            await generator.run(rps, warmup)
+            generator.reset()
+        elapsed, timeouts = await generator.run(rps, duration)
+    finally:
+        await generator.close()
+    completed = generator.histogram.count
+    return {
+        "offered": int(rps * duration),
+        "completed": completed,
+        "errors": generator.errors,
+        "timeouts": timeouts,
+        "statuses": {str(status): count for status, count in sorted(generator.statuses.items())},
+        "throughput_rps": round(completed / elapsed, 1),
+        "late_ms": round(generator.late * 1000, 3),
+        "latency_ms": {name: round(value, 3) for name, value in generator.histogram.summary().items()},
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(__file__), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_list(value, cast=str):
+    return [cast(item) for item in value.split(",") if item]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Open-loop load benchmark for the server engines.")
+    parser.add_argument("--engines", type=parse_list, default=list(ENGINES),
+                        help=f"comma-separated engines from {', '.join(ENGINES)} (default: all)")
+    parser.add_argument("--rps", type=lambda v: parse_list(v, float), default=[500.0, 2000.0],
+                        help="comma-separated target request rates (default: 500,2000)")
+    parser.add_argument("--concurrency", type=lambda v: parse_list(v, int), default=[10, 100],
+                        help="comma-separated numbers of keep-alive connections (default: 10,100)")
+    parser.add_argument("--duration", type=float, default=10, help="measured seconds per run (default: 10)")
+    parser.add_argument("--warmup", type=float, default=2, help="unmeasured seconds before each run (default: 2)")
+    parser.add_argument("--path", default="/index.html", help="request path (default: /index.html)")
+    parser.add_argument("--latency", default="", help="LATENCY spec for the server, e.g. '*=fixed:0.01'")
+    parser.add_argument("--output", default="benchmark_results.json", help="JSON results file")
+    args = parser.parse_args()
+    unknown = set(args.engines) - set(ENGINES)
+    if unknown:
+        parser.error(f"unknown engines: {', '.join(sorted(unknown))}")
+
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+    results = {
+        "meta": {
+            "started": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "settings": {"duration": args.duration, "warmup": args.warmup, "path": args.path,
+                         "latency": args.latency},
+        },
+        "runs": [],
+    }
+    print(f"{'engine':<9} {'rps':>7} {'conns':>5} {'done/s':>8} {'p50':>8} {'p90':>8} {'p99':>8} "
+          f"{'p999':>8} {'errors':>6}")
+    for engine in args.engines:
+        for rps in args.rps:
+            for concurrency in args.concurrency:
+                port = free_port()
+                process = start_server(engine, port, args.latency)
+                try:
+                    run = asyncio.run(measure(port, args.path, rps, concurrency, args.duration, args.warmup))
+                finally:
+                    stop_server(process)
+                run = {"engine": engine, "target_rps": rps, "concurrency": concurrency, **run}
+                results["runs"].append(run)
+                latency = run["latency_ms"]
+                print(f"{engine:<9} {rps:>7.0f} {concurrency:>5} {run['throughput_rps']:>8.0f} "
+                      f"{latency['p50']:>8.2f} {latency['p90']:>8.2f} {latency['p99']:>8.2f} "
+                      f"{latency['p999']:>8.2f} {run['errors'] + run['timeouts']:>6}")
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {args.output} (latencies in ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "server"))
+
+from http_parser import RequestParser, HttpError, MAX_CHUNK_LINE
+
+# Behaviour tests for the incremental request parser in server/http_parser.py: framing checks,
+# size limits, and requests that arrive split across feed() calls. No server needed:
+#
+#   python tests/test_http_parser.py
+
+
+def parse(data, **limits):
+    """Feed data in one piece; returns the complete requests."""
+    parser = RequestParser(**limits)
+    parser.feed(data)
+    requests = []
+    while True:
+        request = parser.next_request()
+        if request is None:
+            return requests
+        requests.append(request)
+
+
+def expect_error(data, status, **limits):
+    try:
+        parse(data, **limits)
+    except HttpError as e:
+        assert e.status == status, f"expected {status}, got {e.status}"
+    else:
+        raise AssertionError(f"expected {status}, request was accepted")
+
+
+def test_simple_request():
+    [request] = parse(b"GET /index.html HTTP/1.1\r\nHost: localhost\r\nAccept: */*\r\n\r\n")
+    assert (request.method, request.path, request.version) == ("GET", "/index.html", "HTTP/1.1")
+    assert request.headers == {"host": "localhost", "accept": "*/*"}
+    assert request.body == b""
+
+
+def test_pipelined_requests_come_out_in_order():
+    requests = parse(b"GET /a HTTP/1.1\r\n\r\nPOST /b HTTP/1.1\r\nContent-Length: 3\r\n\r\nxyzGET /c HTTP/1.1\r\n\r\n")
+    assert [request.path for request in requests] == ["/a", "/b", "/c"]
+    assert requests[1].body == b"xyz"
+
+
+def test_repeated_headers_are_combined():
+    [request] = parse(b"GET / HTTP/1.1\r\nAccept: a\r\naccept: b\r\n\r\n")
+    assert request.headers["accept"] == "a, b"
+
+
+def test_content_length_with_transfer_encoding_is_rejected():
+    # ambiguous framing: a proxy and the server could disagree on where the request ends
+    expect_error(b"POST / HTTP/1.1\r\nContent-Length: 4\r\nTransfer-Encoding: chunked\r\n\r\n0\r\n\r\n",
+                 "400 Bad Request")
+    expect_error(b"POST / HTTP/1.1\r\nTransfer-Encoding: chunked\r\nContent-Length: 4\r\n\r\n0\r\n\r\n",
+                 "400 Bad Request")
+
+
+def test_unsupported_transfer_encoding():
+    expect_error(b"POST / HTTP/1.1\r\nTransfer-Encoding: gzip, chunked\r\n\r\n", "501 Not Implemented")
+
+
+def test_invalid_content_length():
+    for value in (b"-1", b"1e3", b"+5", b"", b"\xb2"):  # the last decodes to "²", which str.isdigit() accepts
+        expect_error(b"POST / HTTP/1.1\r\nContent-Length: " + value + b"\r\n\r\n", "400 Bad Request")
+
+
+def test_chunked_body():
+    [request] = parse(b"POST / HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n"
+                      b"4\r\nWiki\r\n5;ext=1\r\npedia\r\nA\r\n in chunks\r\n0\r\nTrailer: x\r\n\r\n")
+    assert request.body == b"Wikipedia in chunks"
+
+
+def test_chunk_size_validation():
+    head = b"POST / HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n"
+    for line in (b"", b"-4", b"0x4", b"4 4", b"g", b"+4"):
+        expect_error(head + line + b"\r\nWiki\r\n0\r\n\r\n", "400 Bad Request")
+    expect_error(head + b"4\r\nWikipedia\r\n0\r\n\r\n", "400 Bad Request")  # data longer than its size
+    expect_error(head + b"1" * (MAX_CHUNK_LINE + 1), "400 Bad Request")  # endless chunk-size line
+
+
+def test_header_size_limit():
+    expect_error(b"GET / HTTP/1.1\r\nX-Fill: " + b"a" * 200 + b"\r\n\r\n", "431 Request Header Fields Too Large",
+                 max_header_size=100)
+    # also before the end of the head has arrived
+    expect_error(b"GET / HTTP/1.1\r\nX-Fill: " + b"a" * 200, "431 Request Header Fields Too Large",
+                 max_header_size=100)
+
+
+def test_body_size_limit():
+    expect_error(b"POST / HTTP/1.1\r\nContent-Length: 101\r\n\r\n", "413 Content Too Large", max_body_size=100)
+    chunked = b"POST / HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n" + b"32\r\n" + b"a" * 50 + b"\r\n"
+    expect_error(chunked + b"33\r\n", "413 Content Too Large", max_body_size=100)
+    [request] = parse(chunked + b"32\r\n" + b"a" * 50 + b"\r\n0\r\n\r\n", max_body_size=100)
+    assert len(request.body) == 100
+
+
+def test_malformed_request_line_and_headers():
+    expect_error(b"GET /\r\n\r\n", "400 Bad Request")
+    expect_error(b"GET / HTTP/2.0\r\n\r\n", "400 Bad Request")
+    expect_error(b"GET / HTTP/1.1\r\nNo colon here\r\n\r\n", "400 Bad Request")
+    expect_error(b"GET / HTTP/1.1\r\nHost : a\r\n\r\n", "400 Bad Request")
+    expect_error(b"GET / HTTP/1.1\r\nHost: a\r\n folded\r\n\r\n", "400 Bad Request")
+    # control characters in the path would reach routing and the filesystem calls
+    for char in (b"\x00", b"\x01", b"\t", b"\x1f", b"\x7f"):
+        expect_error(b"GET /a" + char + b"b HTTP/1.1\r\n\r\n", "400 Bad Request")
+
+
+def test_split_across_feeds():
+    data = (b"\r\nPOST /upload HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n"
+            b"5\r\nhello\r\n6\r\n world\r\n0\r\n\r\n"
+            b"GET /next HTTP/1.1\r\nContent-Length: 2\r\n\r\nok")
+    # in pieces of several sizes, down to byte by byte
+    for size in (1, 2, 3, 7, 16):
+        parser = RequestParser()
+        requests = []
+        for i in range(0, len(data), size):
+            parser.feed(data[i:i + size])
+            while True:
+                request = parser.next_request()
+                if request is None:
+                    break
+                requests.append(request)
+        assert [(request.path, request.body) for request in requests] == \
+            [("/upload", b"hello world"), ("/next", b"ok")], f"chunks of {size} bytes"
+
+
+def test_incomplete_request_waits_for_more_data():
+    parser = RequestParser()
+    parser.feed(b"POST / HTTP/1.1\r\nContent-Length: 5\r\n\r\nabc")
+    assert parser.next_request() is None
+    parser.feed(b"de")
+    assert parser.next_request().body == b"abcde"
+    assert parser.next_request() is None
+
+
+def test_in_request():
+    parser = RequestParser()
+    assert not parser.in_request()
+    parser.feed(b"\r\n")  # stray line break between requests
+    assert not parser.in_request()
+    parser.feed(b"GET / HTTP/1.1\r\n")
+    assert parser.next_request() is None and parser.in_request()
+    parser.feed(b"\r\n")
+    assert parser.next_request() is not None and not parser.in_request()
+
+
+if __name__ == "__main__":
+    tests = [(name, test) for name, test in globals().items() if name.startswith("test_")]
+    for name, test in tests:
+        test()
+        print(f"{name}: ok")
+    print(f"\n{len(tests)} tests passed")
@@ -1,10 +1,17 @@
 from flask import Flask, request, jsonify
+import json
 import os
+import queue
+import socket
+import socketserver
 import threading
 import time
 import random
 import requests
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
 
 app = Flask(__name__)
 
@@ -24,6 +31,362 @@ FOLLOWERS = [
     f"http://follower{i}:5000" for i in range(1, 6)
 ]
 
+# Leader address, for followers catching up on the replication log
+LEADER_URL = os.getenv('LEADER_URL', 'http://leader:5000')
+# The leader's log only lives in memory, so a restarted leader starts again at seq 1. Every batch
+# and /log response carries the epoch of the leader process that wrote it (its start time, so a
+# newer leader has a larger epoch); a follower that sees a newer epoch drops its state and resyncs.
+LEADER_EPOCH = time.time_ns()
+
+# Expected number of concurrent client writes; sizes the connection pool of each follower
+WRITE_CONCURRENCY = int(os.getenv('WRITE_CONCURRENCY', '20'))
+UNHEALTHY_AFTER = 3  # consecutive failures before a follower is reported unhealthy
+RETRY_DELAY = 0.5  # seconds between batches to an unhealthy follower
+# A write gives unhealthy followers this long to come back before failing for lack of reachable ones
+FAIL_FAST_AFTER = 2 * RETRY_DELAY
+REPLICATION_TIMEOUT = float(os.getenv('REPLICATION_TIMEOUT', '10'))  # seconds a write waits for its quorum
+# Group commit: log entries appended within BATCH_WINDOW seconds of the first unsent one are sent
+# together in one /replicate_batch request, up to BATCH_MAX_SIZE entries
+BATCH_MAX_SIZE = int(os.getenv('BATCH_MAX_SIZE', '100'))
+BATCH_WINDOW = float(os.getenv('BATCH_WINDOW', '0.001'))  # 1ms
+CATCH_UP_INTERVAL = 1  # seconds between a follower's checks for gaps in its log
+CATCH_UP_PAGE = 1000  # entries per /log request while catching up
+# 'stream': one persistent TCP connection per follower carrying newline-delimited JSON batches,
+# pipelined, with acks coming back on the same connection; 'http': /replicate_batch requests
+REPLICATION_TRANSPORT = os.getenv('REPLICATION_TRANSPORT', 'stream')
+REPLICATION_PORT = int(os.getenv('REPLICATION_PORT', '5050'))  # followers' stream listener
+STREAM_WINDOW = int(os.getenv('STREAM_WINDOW', '1000'))  # entries sent but not yet acked, per follower
+
+
+class ReplicationLog:
+    """
+    Append-only, in-memory log of the leader's writes. Sequence numbers start at 1 and have no gaps;
+    entry seq is stored at index seq - 1. Appending wakes the follower senders.
+    """
+
+    def __init__(self):
+        self.entries = []
+        self.appended_at = []
+        self.condition = threading.Condition()
+
+    def append(self, key, value):
+        with self.condition:
+            seq = len(self.entries) + 1
+            self.entries.append({'seq': seq, 'key': key, 'value': value})
+            self.appended_at.append(time.time())
+            self.condition.notify_all()
+            return seq
+
+    def last_seq(self):
+        return len(self.entries)
+
+    def read(self, after, limit):
+        """Up to limit entries with seq > after."""
+        with self.condition:
+            return self.entries[after:after + limit]
+
+    def wait_for(self, last_seq, timeout=None):
+        """Block until the log reaches last_seq (or timeout); returns the current last seq."""
+        with self.condition:
+            self.condition.wait_for(lambda: len(self.entries) >= last_seq, timeout)
+            return len(self.entries)
+
+
+class FollowerChannel:
+    """
+    Long-lived replication channel to one follower: a requests.Session whose pool keeps up to
+    WRITE_CONCURRENCY keep-alive connections open, so a write doesn't pay for a TCP handshake.
+    Tracks the follower's health from the outcome of every request.
+
+    A sender thread sends the replication log to the follower from next_seq on, in batches.
+    acked_seq is the follower's high-water mark: every entry up to it has been applied there. With
+    the stream transport the batches are pipelined over one TCP connection, at most STREAM_WINDOW
+    entries ahead of acked_seq; a broken connection is reopened and resumes at acked_seq + 1. With
+    the http transport up to WRITE_CONCURRENCY /replicate_batch requests are in flight, and a failed
+    one rewinds next_seq to acked_seq + 1. Either way the follower skips entries it already has.
+    """
+
+    def __init__(self, url):
+        self.url = url
+        self.session = requests.Session()
+        # One retry for connections the follower closed while they sat idle in the pool;
+        # followers skip entries they already applied, so resending is harmless
+        retry = Retry(total=1, allowed_methods=None, backoff_factor=0)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=WRITE_CONCURRENCY, max_retries=retry)
+        self.session.mount('http://', adapter)
+        self.lock = threading.Lock()
+        self.healthy = True
+        self.consecutive_failures = 0
+        self.successes = 0
+        self.failures = 0
+        self.last_success = None
+        self.last_error = None
+        # ack_positions[i]: writes this follower acked as the (i+1)-th follower
+        self.ack_positions = [0] * len(FOLLOWERS)
+        self.ack_time_total = 0.0
+        self.batches = 0
+        self.batched_writes = 0
+        self.next_seq = 1
+        self.acked_seq = 0
+        self.acks_changed = threading.Condition(self.lock)
+        self.in_flight = threading.BoundedSemaphore(WRITE_CONCURRENCY)
+        self.stream_address = (urlparse(url).hostname, REPLICATION_PORT)
+        sender = self.stream_loop if REPLICATION_TRANSPORT == 'stream' else self.send_loop
+        threading.Thread(target=sender, name=f"sender-{url}", daemon=True).start()
+
+    def send_loop(self):
+        """Cut the unsent tail of the replication log into batches and hand them to the replication executor."""
+        while True:
+            self.in_flight.acquire()
+            if not self.healthy:
+                time.sleep(RETRY_DELAY)
+            with self.lock:
+                start = self.next_seq
+            # Time out and re-read next_seq: a failed batch may rewind it while we wait for new entries
+            if replication_log.wait_for(start, 0.5) < start:
+                self.in_flight.release()
+                continue
+            # Group commit: give concurrent writes BATCH_WINDOW to join the batch
+            replication_log.wait_for(start + BATCH_MAX_SIZE - 1, BATCH_WINDOW)
+            batch = replication_log.read(start - 1, BATCH_MAX_SIZE)
+            with self.lock:
+                if self.next_seq != start:  # rewound by a failed batch meanwhile
+                    self.in_flight.release()
+                    continue
+                self.next_seq = start + len(batch)
+                self.batches += 1
+                self.batched_writes += len(batch)
+            replication_executor.submit(send_batch, self, batch)
+
+    def stream_loop(self):
+        """Keep a replication stream open to the follower and pipeline the log over it."""
+        while True:
+            try:
+                sock = socket.create_connection(self.stream_address, timeout=5)
+            except OSError as e:
+                self.record(f"stream connect: {e}")
+                time.sleep(RETRY_DELAY)
+                continue
+            self.record(None)  # reachable again: don't let writes give up on it because of old failures
+            sock.settimeout(None)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            with self.lock:
+                self.next_seq = self.acked_seq + 1
+            broken = threading.Event()
+            outbox = queue.Queue()  # (deliver_at, line) in send order
+            threading.Thread(target=self.read_acks, args=(sock, broken), daemon=True).start()
+            threading.Thread(target=self.write_lines, args=(sock, outbox, broken), daemon=True).start()
+            self.cut_batches(outbox, broken)
+            outbox.put(None)
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            sock.close()
+            time.sleep(RETRY_DELAY)
+
+    def cut_batches(self, outbox, broken):
+        """Turn new log entries into batches for the stream until it breaks."""
+        deliver_at = 0.0
+        while not broken.is_set():
+            with self.acks_changed:
+                if not self.acks_changed.wait_for(
+                        lambda: broken.is_set() or self.next_seq - 1 - self.acked_seq < STREAM_WINDOW, 0.5):
+                    continue
+                start = self.next_seq
+            if replication_log.wait_for(start, 0.5) < start:
+                continue
+            # Group commit: give concurrent writes BATCH_WINDOW to join the batch
+            replication_log.wait_for(start + BATCH_MAX_SIZE - 1, BATCH_WINDOW)
+            batch = replication_log.read(start - 1, BATCH_MAX_SIZE)
+            with self.lock:
+                self.next_seq = start + len(batch)
+                self.batches += 1
+                self.batched_writes += len(batch)
+            # Simulate network lag per batch without stalling the pipeline: later batches may not
+            # overtake earlier ones, like on a real TCP connection
+            deliver_at = max(deliver_at, time.monotonic() + random.uniform(MIN_DELAY, MAX_DELAY))
+            line = json.dumps({'epoch': LEADER_EPOCH, 'entries': batch}).encode() + b'\n'
+            outbox.put((deliver_at, line))
+
+    def write_lines(self, sock, outbox, broken):
+        while True:
+            item = outbox.get()
+            if item is None:
+                return
+            deliver_at, line = item
+            time.sleep(max(0.0, deliver_at - time.monotonic()))
+            try:
+                sock.sendall(line)
+            except OSError as e:
+                self.break_stream(broken, f"stream send: {e}")
+                return
+
+    def read_acks(self, sock, broken):
+        """Acks arrive asynchronously, one {"epoch": ..., "acked": <high-water mark>} line per batch."""
+        try:
+            for line in sock.makefile('rb'):
+                self.record(None)
+                ack = json.loads(line)
+                self.acknowledge(ack['acked'], ack.get('epoch'))
+            error = "stream closed by follower"
+        except (OSError, ValueError, KeyError) as e:
+            error = f"stream receive: {e}"
+        if not broken.is_set():
+            self.break_stream(broken, error)
+
+    def break_stream(self, broken, error):
+        broken.set()
+        self.record(error)
+        with self.acks_changed:
+            self.acks_changed.notify_all()
+
+    def post(self, path, payload):
+        """POST a JSON payload to the follower. Returns the decoded response on a 200, else None."""
+        result = None
+        try:
+            response = self.session.post(f"{self.url}{path}", json=payload, timeout=5)
+            if response.status_code == 200:
+                result = response.json()
+                error = None
+            else:
+                error = f"HTTP {response.status_code}"
+        except (requests.RequestException, ValueError) as e:
+            error = str(e)
+        self.record(error)
+        return result
+
+    def record(self, error):
+        with self.lock:
+            if error is None:
+                self.successes += 1
+                self.consecutive_failures = 0
+                self.last_success = time.time()
+                if not self.healthy:
+                    self.healthy = True
+                    print(f"Follower {self.url} is healthy again")
+                return
+            self.failures += 1
+            self.consecutive_failures += 1
+            self.last_error = error
+            print(f"Replication to {self.url} failed: {error}")
+            if self.healthy and self.consecutive_failures >= UNHEALTHY_AFTER:
+                self.healthy = False
+                print(f"Follower {self.url} marked unhealthy after {self.consecutive_failures} failures")
+        if not self.healthy:
+            ack_tracker.wake()  # writes waiting on this follower may no longer reach their quorum
+
+    def acknowledge(self, high_water_mark, epoch):
+        """The follower applied everything of this leader's log up to high_water_mark."""
+        if epoch != LEADER_EPOCH:
+            return  # the follower is still on another leader's log and will resync
+        # Never beyond our own log, whatever the follower claims
+        high_water_mark = min(high_water_mark, replication_log.last_seq())
+        with self.lock:
+            previous = self.acked_seq
+            if high_water_mark <= previous:
+                return
+            self.acked_seq = high_water_mark
+            self.acks_changed.notify_all()
+        ack_tracker.advance(self, previous, high_water_mark)
+
+    def rewind(self):
+        """Resend from the first entry the follower has not acked."""
+        with self.lock:
+            self.next_seq = min(self.next_seq, self.acked_seq + 1)
+
+    def record_ack(self, position, elapsed):
+        with self.lock:
+            self.ack_positions[position - 1] += 1
+            self.ack_time_total += elapsed
+
+    def stats(self):
+        with self.lock:
+            acked = sum(self.ack_positions)
+            return {
+                'url': self.url,
+                'healthy': self.healthy,
+                'successes': self.successes,
+                'failures': self.failures,
+                'consecutive_failures': self.consecutive_failures,
+                'last_success': self.last_success,
+                'last_error': self.last_error,
+                'acked_seq': self.acked_seq,
+                'next_seq': self.next_seq,
+                'ack_positions': list(self.ack_positions),
+                'in_quorum': sum(self.ack_positions[:WRITE_QUORUM]),
+                'mean_ack_ms': round(self.ack_time_total / acked * 1000, 3) if acked else None,
+                'batches': self.batches,
+                'mean_batch_size': round(self.batched_writes / self.batches, 2) if self.batches else None
+            }
+
+
+class AckTracker:
+    """
+    Turns the followers' high-water marks into per-write quorums. A client's request thread waits
+    here until WRITE_QUORUM followers acked its entry's seq; later acks are still recorded.
+    """
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.ack_counts = {}  # seq -> followers that acked it, until all of them did
+
+    def advance(self, channel, previous, high_water_mark):
+        now = time.time()
+        with self.condition:
+            for seq in range(previous + 1, high_water_mark + 1):
+                position = self.ack_counts.get(seq, 0) + 1
+                if position == len(channels):
+                    self.ack_counts.pop(seq, None)
+                else:
+                    self.ack_counts[seq] = position
+                channel.record_ack(position, now - replication_log.appended_at[seq - 1])
+            self.condition.notify_all()
+
+    def wake(self):
+        with self.condition:
+            self.condition.notify_all()
+
+    def acks(self, seq):
+        return sum(1 for channel in channels if channel.acked_seq >= seq)
+
+    def reachable(self, seq):
+        return sum(1 for channel in channels if channel.acked_seq >= seq or channel.healthy)
+
+    def wait(self, seq, quorum, timeout):
+        """
+        Block until quorum followers acked seq, too few healthy followers are left to get there,
+        or timeout passes; returns the acks so far. Unhealthy followers get FAIL_FAST_AFTER to
+        prove they are back (two retry rounds) before the write gives up on them.
+        """
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            self.condition.wait_for(lambda: self.acks(seq) >= quorum, min(timeout, FAIL_FAST_AFTER))
+            self.condition.wait_for(
+                lambda: self.acks(seq) >= quorum or self.reachable(seq) < quorum,
+                max(0.0, deadline - time.monotonic())
+            )
+            return self.acks(seq)
+
+
+replication_log = ReplicationLog()
+ack_tracker = AckTracker()
+
+# Follower side: entries up to applied_seq of leader_epoch's log are in data_store; later ones
+# that arrived early wait in pending_entries until the gap before them is filled
+leader_epoch = None
+applied_seq = 0
+pending_entries = {}
+
+# Long-lived replication dispatcher: room for WRITE_CONCURRENCY batches in flight per follower
+replication_executor = ThreadPoolExecutor(
+    max_workers=WRITE_CONCURRENCY * len(FOLLOWERS),
+    thread_name_prefix='replicate'
+) if NODE_TYPE == 'leader' else None
+
+# Created once at startup and shared by all request threads
+channels = [FollowerChannel(url) for url in FOLLOWERS] if NODE_TYPE == 'leader' else []
+
 @app.route('/status', methods=['GET'])
 def status():
     """Return node status and current data"""
@@ -31,6 +394,7 @@ def status():
         return jsonify({
             'node_type': NODE_TYPE,
             'data_count': len(data_store),
+            'applied_seq': replication_log.last_seq() if NODE_TYPE == 'leader' else applied_seq,
             'data': dict(data_store)
         })
 
@@ -69,12 +433,13 @@ def set_value():
     key = data['key']
     value = data['value']
     
-    # Write to leader's own storage
+    # Write to leader's own storage and append to the replication log in the same order
     with data_lock:
         data_store[key] = value
+        seq = replication_log.append(key, value)
     
     # Replicate to followers (semi-synchronous)
-    success_count = replicate_to_followers(key, value)
+    success_count = replicate_to_followers(seq)
     
     if success_count >= WRITE_QUORUM:
         return jsonify({
@@ -89,6 +454,39 @@ def set_value():
             'error': f'Not enough replicas confirmed. Got {success_count}, need {WRITE_QUORUM}'
         }), 500
 
+@app.route('/replication_status', methods=['GET'])
+def replication_status():
+    """Return the health of each follower's replication channel (leader only)"""
+    if NODE_TYPE != 'leader':
+        return jsonify({
+            'success': False,
+            'error': 'Only the leader replicates'
+        }), 403
+
+    return jsonify({
+        'write_quorum': WRITE_QUORUM,
+        'last_seq': replication_log.last_seq(),
+        'followers': [channel.stats() for channel in channels]
+    })
+
+@app.route('/log', methods=['GET'])
+def read_log():
+    """Return replication log entries after ?after=<seq>, at most ?limit=<n> (leader only)"""
+    if NODE_TYPE != 'leader':
+        return jsonify({
+            'success': False,
+            'error': 'Only the leader has a replication log'
+        }), 403
+
+    after = request.args.get('after', 0, type=int)
+    limit = min(request.args.get('limit', CATCH_UP_PAGE, type=int), CATCH_UP_PAGE)
+    return jsonify({
+        'success': True,
+        'epoch': LEADER_EPOCH,
+        'last_seq': replication_log.last_seq(),
+        'entries': replication_log.read(max(after, 0), max(limit, 0))
+    })
+
 @app.route('/replicate', methods=['POST'])
 def replicate():
     """Receive replication request from leader (followers only)"""
@@ -117,53 +515,171 @@ def replicate():
         'key': key
     })
 
-def replicate_to_followers(key, value):
+@app.route('/replicate_batch', methods=['POST'])
+def replicate_batch():
+    """Receive a batch of replication log entries from the leader (followers only)"""
+    if NODE_TYPE != 'follower':
+        return jsonify({
+            'success': False,
+            'error': 'Only followers accept replication requests'
+        }), 403
+
+    data = request.get_json()
+    if not valid_batch(data):
+        return jsonify({
+            'success': False,
+            'error': 'Invalid replication batch'
+        }), 400
+
+    # Acknowledge the high-water mark: everything up to it is applied, in log order
+    epoch, acked = apply_entries(data['epoch'], data['entries'])
+    return jsonify({
+        'success': True,
+        'epoch': epoch,
+        'acked': acked
+    })
+
+def valid_entry(entry):
+    return (isinstance(entry, dict) and isinstance(entry.get('seq'), int) and entry['seq'] > 0
+            and 'key' in entry and 'value' in entry)
+
+def valid_batch(data):
+    return (isinstance(data, dict) and isinstance(data.get('epoch'), int)
+            and isinstance(data.get('entries'), list)
+            and all(valid_entry(entry) for entry in data['entries']))
+
+def apply_entries(epoch, entries):
     """
-    Replicate data to followers with simulated network delay.
-    Returns the number of successful confirmations.
-    Uses concurrent requests with individual delays.
+    Apply log entries of the given leader epoch in sequence order (follower side). Entries already
+    applied are skipped; entries beyond a gap are held until the missing ones arrive. A newer epoch
+    means the leader restarted with a fresh log: the follower drops its data and replays the new
+    log from seq 1 (catch_up_loop fetches what is missing). Entries from an older epoch are ignored.
+    Returns (epoch, high-water mark) of the log the follower is on.
     """
-    def replicate_to_one_follower(follower_url):
-        try:
-            # Simulate network lag
-            delay = random.uniform(MIN_DELAY, MAX_DELAY)
-            time.sleep(delay)
-            
-            # Send replication request
-            response = requests.post(
-                f"{follower_url}/replicate",
-                json={'key': key, 'value': value},
-                timeout=5
-            )
-            
-            if response.status_code == 200:
-                return True
-            return False
-        except Exception as e:
-            print(f"Replication to {follower_url} failed: {e}")
-            return False
-    
-    # Send replication requests concurrently
-    success_count = 0
-    with ThreadPoolExecutor(max_workers=len(FOLLOWERS)) as executor:
-        futures = [
-            executor.submit(replicate_to_one_follower, follower)
-            for follower in FOLLOWERS
-        ]
-        
-        for future in as_completed(futures):
-            if future.result():
-                success_count += 1
-                # Early return if we have enough confirmations
-                if success_count >= WRITE_QUORUM:
-                    break
-    
-    return success_count
+    global leader_epoch, applied_seq
+    with data_lock:
+        if leader_epoch is None or epoch > leader_epoch:
+            if leader_epoch is not None:
+                print(f"New leader epoch {epoch}, resyncing from seq 1")
+                data_store.clear()
+            leader_epoch = epoch
+            applied_seq = 0
+            pending_entries.clear()
+        elif epoch < leader_epoch:
+            return leader_epoch, applied_seq
+        for entry in entries:
+            if entry['seq'] > applied_seq:
+                pending_entries[entry['seq']] = entry
+        while applied_seq + 1 in pending_entries:
+            entry = pending_entries.pop(applied_seq + 1)
+            data_store[entry['key']] = entry['value']
+            applied_seq += 1
+        return leader_epoch, applied_seq
+
+class ReplicationStreamHandler(socketserver.StreamRequestHandler):
+    """
+    Follower side of a replication stream: newline-delimited JSON batches of log entries come in,
+    and every batch is answered with a {"acked": <high-water mark>} line once it is applied.
+    """
+
+    def handle(self):
+        for line in self.rfile:
+            try:
+                batch = json.loads(line)
+            except ValueError:
+                return
+            if not valid_batch(batch):
+                return
+            epoch, acked = apply_entries(batch['epoch'], batch['entries'])
+            self.wfile.write(json.dumps({'epoch': epoch, 'acked': acked}).encode() + b'\n')
+
+
+class ReplicationStreamServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+def serve_replication_stream():
+    with ReplicationStreamServer(('0.0.0.0', REPLICATION_PORT), ReplicationStreamHandler) as server:
+        server.serve_forever()
+
+def catch_up():
+    """Fetch the entries after our high-water mark from the leader's log until there are no more."""
+    while True:
+        response = requests.get(f"{LEADER_URL}/log", params={'after': applied_seq, 'limit': CATCH_UP_PAGE},
+                                timeout=5)
+        response.raise_for_status()
+        data = response.json()
+        if not valid_batch(data):
+            raise ValueError("invalid /log response")
+        if data['epoch'] != leader_epoch:
+            # The page was read at our old epoch's position: switch to the leader's log and start over
+            if apply_entries(data['epoch'], [])[0] != data['epoch']:
+                return
+            continue
+        if not data['entries']:
+            return
+        apply_entries(data['epoch'], data['entries'])
+        print(f"Caught up to seq {applied_seq}")
+        if len(data['entries']) < CATCH_UP_PAGE:
+            return
+
+def catch_up_loop():
+    """
+    Follower background thread: catch up from the leader's log at startup, and whenever entries
+    have been waiting behind the same gap for a whole CATCH_UP_INTERVAL (e.g. after a restart,
+    or when a batch was lost and the leader has not resent it yet).
+    """
+    started = False
+    stalled_at = None
+    while True:
+        with data_lock:
+            gap_at = applied_seq if pending_entries else None
+        if not started or (gap_at is not None and gap_at == stalled_at):
+            try:
+                catch_up()
+                started = True
+            except (requests.RequestException, ValueError, KeyError) as e:
+                print(f"Catch-up from {LEADER_URL} failed: {e}")
+            stalled_at = None
+        else:
+            stalled_at = gap_at
+        time.sleep(CATCH_UP_INTERVAL)
+
+def send_batch(channel, batch):
+    try:
+        # Simulate network lag, once per batch
+        delay = random.uniform(MIN_DELAY, MAX_DELAY)
+        time.sleep(delay)
+
+        # One request on a pooled keep-alive connection carries every entry of the batch
+        result = channel.post('/replicate_batch', {'epoch': LEADER_EPOCH, 'entries': batch})
+        if result is None:
+            channel.rewind()
+        else:
+            channel.acknowledge(result.get('acked', 0), result.get('epoch'))
+    finally:
+        channel.in_flight.release()
+
+def replicate_to_followers(seq):
+    """
+    Wait until log entry seq is replicated (the sender threads push it to every follower).
+    Returns the number of followers that confirmed it once WRITE_QUORUM is reached (or can no
+    longer be reached, or REPLICATION_TIMEOUT passed). Slower followers keep receiving the log
+    after this returns.
+    """
+    return ack_tracker.wait(seq, WRITE_QUORUM, REPLICATION_TIMEOUT)
 
 if __name__ == '__main__':
     print(f"Starting {NODE_TYPE} node on port {PORT}")
     print(f"Write quorum: {WRITE_QUORUM}")
     print(f"Delay range: {MIN_DELAY*1000:.2f}ms - {MAX_DELAY*1000:.2f}ms")
+
+    if NODE_TYPE == 'follower':
+        threading.Thread(target=catch_up_loop, name='catch-up', daemon=True).start()
+        threading.Thread(target=serve_replication_stream, name='replication-stream', daemon=True).start()
+    else:
+        print(f"Replication transport: {REPLICATION_TRANSPORT}")
     
     # Run Flask with threading enabled for concurrent request handling
     app.run(host='0.0.0.0', port=PORT, threaded=True)
@@ -0,0 +1,139 @@
+import os
+import sys
+
+# Follower-side log application, tested in-process: no docker-compose needed.
+#   python tests/test_apply_entries.py
+os.environ['NODE_TYPE'] = 'follower'  # no follower channels or sender threads on import
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import server
+from server import apply_entries
+
+EPOCH = 1000
+
+def entry(seq, key, value):
+    return {'seq': seq, 'key': key, 'value': value}
+
+def reset():
+    server.leader_epoch = None
+    server.applied_seq = 0
+    server.pending_entries.clear()
+    server.data_store.clear()
+
+def check(condition, message):
+    print(f"  {'✓' if condition else '✗'} {message}")
+    return condition
+
+def test_in_order():
+    """Entries that arrive in order are applied at once"""
+    print("\n=== Testing In-Order Apply ===")
+    reset()
+    result = apply_entries(EPOCH, [entry(1, 'a', 'v1'), entry(2, 'b', 'v2'), entry(3, 'a', 'v3')])
+    return all([
+        check(result == (EPOCH, 3), f"acked seq 3 (got {result})"),
+        check(server.data_store == {'a': 'v3', 'b': 'v2'}, "later write to 'a' wins"),
+        check(not server.pending_entries, "nothing pending"),
+    ])
+
+def test_gap_is_held_back():
+    """Entries after a gap wait in pending_entries until the gap is filled"""
+    print("\n=== Testing Gap Handling ===")
+    reset()
+    apply_entries(EPOCH, [entry(1, 'k', 'v1')])
+    result = apply_entries(EPOCH, [entry(3, 'k', 'v3'), entry(4, 'other', 'v4')])
+    ok = all([
+        check(result == (EPOCH, 1), f"high-water mark stays at 1 while seq 2 is missing (got {result})"),
+        check(server.data_store == {'k': 'v1'}, "entries after the gap are not applied yet"),
+        check(sorted(server.pending_entries) == [3, 4], "seq 3 and 4 are pending"),
+    ])
+    result = apply_entries(EPOCH, [entry(2, 'k', 'v2')])
+    return ok and all([
+        check(result == (EPOCH, 4), f"filling the gap applies everything up to 4 (got {result})"),
+        check(server.data_store == {'k': 'v3', 'other': 'v4'}, "applied in seq order: seq 3 overwrote seq 2"),
+        check(not server.pending_entries, "nothing pending"),
+    ])
+
+def test_reordered_batches():
+    """Batches that overtake each other end in the same state as in-order delivery"""
+    print("\n=== Testing Reordered Batches ===")
+    reset()
+    apply_entries(EPOCH, [entry(3, 'k', 'v3')])
+    apply_entries(EPOCH, [entry(2, 'k', 'v2')])
+    result = apply_entries(EPOCH, [entry(1, 'k', 'v1')])
+    return all([
+        check(result == (EPOCH, 3), f"acked seq 3 (got {result})"),
+        check(server.data_store == {'k': 'v3'}, "highest seq wins, not the last batch to arrive"),
+    ])
+
+def test_duplicates_are_skipped():
+    """A resent batch (after a rewind) doesn't apply old values again"""
+    print("\n=== Testing Duplicate Entries ===")
+    reset()
+    apply_entries(EPOCH, [entry(1, 'k', 'v1'), entry(2, 'k', 'v2')])
+    result = apply_entries(EPOCH, [entry(1, 'k', 'v1'), entry(2, 'k', 'v2'), entry(1, 'k', 'v1')])
+    return all([
+        check(result == (EPOCH, 2), f"high-water mark unchanged (got {result})"),
+        check(server.data_store == {'k': 'v2'}, "old value not re-applied"),
+        check(not server.pending_entries, "duplicates are not kept as pending"),
+    ])
+
+def test_new_epoch_resyncs():
+    """A restarted leader (newer epoch) replaces the follower's state with its own log"""
+    print("\n=== Testing Leader Restart (New Epoch) ===")
+    reset()
+    apply_entries(EPOCH, [entry(seq, f'a{seq}', 'old') for seq in range(1, 5)])
+    apply_entries(EPOCH, [entry(6, 'a6', 'old')])  # pending behind a gap
+    result = apply_entries(EPOCH + 1, [entry(1, 'b1', 'new')])
+    return all([
+        check(result == (EPOCH + 1, 1), f"restarts at the new leader's seq 1 (got {result})"),
+        check(server.data_store == {'b1': 'new'}, "data of the old log dropped"),
+        check(not server.pending_entries, "pending entries of the old log dropped"),
+    ])
+
+def test_old_epoch_is_ignored():
+    """Late batches from a previous leader don't touch the state"""
+    print("\n=== Testing Stale Epoch ===")
+    reset()
+    apply_entries(EPOCH, [entry(1, 'k', 'current')])
+    result = apply_entries(EPOCH - 1, [entry(1, 'k', 'stale'), entry(2, 'x', 'stale')])
+    return all([
+        check(result == (EPOCH, 1), f"answers with the current epoch and mark (got {result})"),
+        check(server.data_store == {'k': 'current'}, "stale entries not applied"),
+        check(not server.pending_entries, "stale entries not kept"),
+    ])
+
+def main():
+    print("=" * 60)
+    print("FOLLOWER LOG APPLICATION TESTS")
+    print("=" * 60)
+
+    tests = [
+        test_in_order,
+        test_gap_is_held_back,
+        test_reordered_batches,
+        test_duplicates_are_skipped,
+        test_new_epoch_resyncs,
+        test_old_epoch_is_ignored,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+            else:
+                failed += 1
+        except Exception as e:
+            print(f"✗ Test crashed: {e}")
+            failed += 1
+
+    print("\n" + "=" * 60)
+    print(f"RESULTS: {passed} passed, {failed} failed")
+    print("=" * 60)
+
+    return 0 if failed == 0 else 1
+
+if __name__ == "__main__":
+    sys.exit(main())